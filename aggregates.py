@@ -0,0 +1,93 @@
+"""
+Subtractive aggregate maintenance for counterparty exclusions.
+
+Per-counterparty contributions (total, count, and per-day-of-month sums and
+counts) are computed once. Excluding counterparties then subtracts their rows
+of contributions from the overall totals and daily series, which costs
+O(excluded counterparties x days) instead of a rescan of every transaction.
+"""
+
+import numpy as np
+import pandas as pd
+
+import polars_backend
+
+
+def contributions(frame, value, by='Counterparty', period='Day of Month'):
+    """
+    Precomputes each group's contribution to the totals and the per-period series.
+
+    Args:
+    frame: Transactions with `by`, `period` and `value` columns.
+    value: The amount column to aggregate.
+    by: The column whose groups can be excluded.
+    period: The column of the daily series.
+
+    Returns:
+    dict: Group labels (largest total first) with their sums and counts,
+        group x period matrices of sums and counts, and the overall totals
+        that exclusions are subtracted from.
+    """
+    if polars_backend.enabled():
+        cells = polars_backend.group_sums(frame, [by, period], value)
+    else:
+        cells = frame.groupby([by, period], observed=True)[value].agg(['sum', 'count'])
+    sums = cells['sum'].unstack(fill_value=0.0)
+    counts = cells['count'].unstack(fill_value=0)
+
+    order = sums.sum(axis=1).sort_values(ascending=False, kind='stable').index
+    sums, counts = sums.loc[order], counts.loc[order]
+
+    period_sums, period_counts = sums.to_numpy(), counts.to_numpy()
+    group_sums, group_counts = period_sums.sum(axis=1), period_counts.sum(axis=1)
+    return {
+        'value': value,
+        'by': by,
+        'period': period,
+        'groups': pd.Index(order.tolist()),
+        'group_sums': group_sums,
+        'group_counts': group_counts,
+        'periods': sums.columns.to_numpy(),
+        'period_sums': period_sums,
+        'period_counts': period_counts,
+        'total': group_sums.sum(),
+        'count': int(group_counts.sum()),
+        'period_totals': period_sums.sum(axis=0),
+        'period_total_counts': period_counts.sum(axis=0),
+    }
+
+
+def excluding(contrib, removed=(), top_n=15):
+    """
+    Aggregates with the `removed` groups subtracted.
+
+    Returns:
+    dict: 'total', 'mean' and 'count'; 'daily' (period, value) for periods
+        that still have transactions; 'top' (group, value) for the `top_n`
+        largest remaining groups.
+    """
+    value, by, period = contrib['value'], contrib['by'], contrib['period']
+    positions = contrib['groups'].get_indexer(list(removed))
+    positions = positions[positions >= 0]
+
+    total = contrib['total'] - contrib['group_sums'][positions].sum()
+    count = contrib['count'] - int(contrib['group_counts'][positions].sum())
+    period_sums = contrib['period_totals'] - contrib['period_sums'][positions].sum(axis=0)
+    period_counts = contrib['period_total_counts'] - contrib['period_counts'][positions].sum(axis=0)
+
+    kept = period_counts > 0
+    daily = pd.DataFrame({period: contrib['periods'][kept], value: period_sums[kept]})
+
+    remaining = np.ones(len(contrib['groups']), dtype=bool)
+    remaining[positions] = False
+    # Groups are stored largest first, so the top N are the first N remaining
+    top_positions = np.flatnonzero(remaining)[:top_n]
+    top = pd.DataFrame({by: contrib['groups'][top_positions], value: contrib['group_sums'][top_positions]})
+
+    return {
+        'total': float(total) if count else 0.0,
+        'mean': float(total / count) if count else 0.0,
+        'count': count,
+        'daily': daily,
+        'top': top,
+    }
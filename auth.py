@@ -0,0 +1,159 @@
+"""
+Login for the dashboard pages.
+
+Credentials are read from ``st.secrets["passwords"]`` once per process and
+kept as a map of username to password digest. Verification compares
+digests in constant time, also for unknown usernames, so response time
+reveals neither which users exist nor how long their passwords are.
+
+Failed attempts are counted per username in a process-wide table. After
+MAX_FREE_ATTEMPTS failures the username has to wait before trying again,
+and the wait doubles with every further failure up to MAX_DELAY_S.
+Attempts made while waiting are refused before any hashing.
+
+Failures are also counted per client address, as a brake on guessing
+across many usernames. The address is ``st.context.ip_address``, the peer
+of the app's WebSocket: behind a reverse proxy such as the App Service
+front end it can be the proxy's address, shared by every user. The
+address limit is therefore set far higher than the username limit, a
+successful login clears it, and it is never used to grant access.
+"""
+
+import hashlib
+import hmac
+import math
+import os
+import threading
+import time
+
+import streamlit as st
+
+MAX_FREE_ATTEMPTS = 3
+# Per client address; high because the address may be a proxy shared by all users
+MAX_FREE_ATTEMPTS_PER_ADDRESS = 50
+BASE_DELAY_S = 2.0
+MAX_DELAY_S = 300.0
+# Failure counts are forgotten after this long without new failures
+FORGET_AFTER_S = 3600.0
+
+# Stands in for the stored digest of unknown users, so they cost the same comparison
+_DUMMY_DIGEST = hashlib.sha256(os.urandom(32)).digest()
+
+
+def _digest(password):
+    return hashlib.sha256(password.encode('utf-8')).digest()
+
+
+@st.cache_resource
+def _credentials():
+    """Username -> password digest, loaded from secrets once per process."""
+    return {str(user): _digest(str(password)) for user, password in st.secrets.get("passwords", {}).items()}
+
+
+class AttemptLimiter:
+    """Thread-safe failed-attempt counters with exponential backoff."""
+
+    def __init__(self, free_attempts=MAX_FREE_ATTEMPTS):
+        self.free_attempts = free_attempts
+        self._failures = {}
+        self._lock = threading.Lock()
+
+    def delay(self, failures):
+        """Seconds a key must wait after its latest failure, given its failure count."""
+        if failures < self.free_attempts:
+            return 0.0
+        return min(BASE_DELAY_S * 2 ** (failures - self.free_attempts), MAX_DELAY_S)
+
+    def retry_after(self, key, now=None):
+        """Seconds until `key` may try again; 0 if it may try now."""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            failures, last = self._failures.get(key, (0, now))
+        return max(0.0, last + self.delay(failures) - now)
+
+    def record_failure(self, key, now=None):
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            failures, last = self._failures.get(key, (0, now))
+            if now - last > FORGET_AFTER_S:
+                failures = 0
+            self._failures[key] = (failures + 1, now)
+            self._prune(now)
+
+    def reset(self, key):
+        with self._lock:
+            self._failures.pop(key, None)
+
+    def _prune(self, now):
+        stale = [key for key, (_, last) in self._failures.items() if now - last > FORGET_AFTER_S]
+        for key in stale:
+            del self._failures[key]
+
+
+_limiter = AttemptLimiter()
+_address_limiter = AttemptLimiter(MAX_FREE_ATTEMPTS_PER_ADDRESS)
+
+
+def verify(username, password, ip_address=None, now=None):
+    """
+    Checks a login attempt against the stored credentials and the attempt limits.
+
+    Args:
+    username: The submitted username.
+    password: The submitted password.
+    ip_address: The client's address, if known.
+    now: Monotonic time of the attempt; defaults to the current time.
+
+    Returns:
+    tuple: (True, 0.0) on success, (False, 0.0) for wrong credentials, or
+        (False, seconds) when the user or address must wait before trying again.
+    """
+    counters = [(_limiter, username.strip().lower())]
+    if ip_address:
+        counters.append((_address_limiter, ip_address))
+
+    wait = max(limiter.retry_after(key, now) for limiter, key in counters)
+    if wait > 0:
+        return False, wait
+
+    stored = _credentials().get(username)
+    matches = hmac.compare_digest(_digest(password), stored if stored is not None else _DUMMY_DIGEST)
+    if matches and stored is not None:
+        for limiter, key in counters:
+            limiter.reset(key)
+        return True, 0.0
+
+    for limiter, key in counters:
+        limiter.record_failure(key, now)
+    return False, 0.0
+
+
+def _password_entered():
+    """Form callback: verifies the submitted credentials and clears them from session state."""
+    ok, wait = verify(
+        st.session_state.get("username", ""),
+        st.session_state.get("password", ""),
+        st.context.ip_address,
+    )
+    st.session_state["password_correct"] = ok
+    st.session_state["login_retry_after"] = wait
+    # Don't store the username or password.
+    del st.session_state["password"]
+    del st.session_state["username"]
+
+
+def require_login():
+    """Shows the login form and stops the page until this session has logged in."""
+    if st.session_state.get("password_correct", False):
+        return
+
+    with st.form("Credentials"):
+        st.text_input("Username", key="username")
+        st.text_input("Password", type="password", key="password")
+        st.form_submit_button("Log in", on_click=_password_entered)
+
+    if st.session_state.get("login_retry_after", 0) > 0:
+        st.error(f"⏳ Too many failed attempts. Try again in {math.ceil(st.session_state['login_retry_after'])} s.")
+    elif "password_correct" in st.session_state:
+        st.error("😕 User not known or password incorrect")
+    st.stop()
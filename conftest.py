@@ -0,0 +1,126 @@
+"""
+Shared pytest fixtures: synthetic statements at several scales and the
+benchmark harness behind test_benchmarks.py.
+
+Benchmarks time a function (best of a few runs) and divide by the time of a
+fixed calibration workload measured in the same session, so the stored
+baselines carry over between machines of different speeds. A benchmark fails
+when its normalized time exceeds the baseline by more than the tolerance.
+
+    python -m pytest -m benchmark --update-baselines   # re-record baselines
+    python -m pytest -m "not benchmark"                # skip the benchmarks
+
+CI runs the benchmarks in their own job, which does not gate the deploy.
+"""
+
+import json
+import os
+import time
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import loadtest
+
+BASELINES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_baselines.json")
+# A benchmark may run this much slower than its baseline before it fails
+TOLERANCE = float(os.environ.get("MPESA_BENCH_TOLERANCE", "2.0"))
+# Sub-millisecond benchmarks are mostly timer and scheduler noise, so every
+# benchmark also gets this much absolute headroom, in calibration units
+NOISE_FLOOR = 0.05
+SCALES = {"small": 2_000, "medium": 20_000}
+
+
+def pytest_addoption(parser):
+    parser.addoption("--update-baselines", action="store_true",
+                     help="Record benchmark timings as the new baselines instead of checking them")
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "benchmark: timing test checked against benchmark_baselines.json")
+
+
+@lru_cache(maxsize=None)
+def _statement(rows):
+    return loadtest.synthetic_statement(rows, seed=rows % 97, days=3 * 365)
+
+
+@pytest.fixture(scope="session")
+def synthetic():
+    """Returns a cached synthetic statement with `rows` transactions; callers must not modify it."""
+    return _statement
+
+
+@pytest.fixture(scope="session", params=["small", "medium"])
+def statement_rows(request):
+    """A statement size; tests using it run once per scale."""
+    return SCALES[request.param]
+
+
+def best_time(func, *args, repeat=5, **kwargs):
+    """Fastest of `repeat` timed calls, in seconds, and the last result."""
+    timings, result = [], None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args, **kwargs)
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def _calibration_workload():
+    rng = np.random.default_rng(0)
+    values = rng.lognormal(6.5, 1.2, 200_000)
+    frame = pd.DataFrame({'key': rng.integers(0, 500, len(values)), 'value': values})
+    frame.groupby('key')['value'].agg(['sum', 'count'])
+    np.sort(values)
+    sum(str(v)[:4] == "1000" for v in values[:50_000])
+
+
+@pytest.fixture(scope="session")
+def calibration_s():
+    """Time of a fixed mix of pandas, numpy and pure-Python work on this machine."""
+    return best_time(_calibration_workload, repeat=5)[0]
+
+
+@pytest.fixture(scope="session")
+def baselines(request):
+    stored = {}
+    if os.path.exists(BASELINES_PATH):
+        with open(BASELINES_PATH) as f:
+            stored = json.load(f)
+    recorded = {}
+    yield stored, recorded
+    if request.config.getoption("--update-baselines") and recorded:
+        with open(BASELINES_PATH, "w") as f:
+            json.dump({**stored, **recorded}, f, indent=2, sort_keys=True)
+            f.write("\n")
+
+
+@pytest.fixture
+def benchmark(request, calibration_s, baselines):
+    """
+    Times `func(*args, **kwargs)` against this test's stored baseline.
+
+    Returns the function's result, so tests can also check it.
+    """
+    stored, recorded = baselines
+    name = request.node.name
+
+    def run(func, *args, repeat=5, **kwargs):
+        elapsed, result = best_time(func, *args, repeat=repeat, **kwargs)
+        ratio = elapsed / calibration_s
+        if request.config.getoption("--update-baselines"):
+            recorded[name] = round(ratio, 4)
+            return result
+        if name not in stored:
+            pytest.skip(f"No baseline for {name}; run with --update-baselines")
+        allowed = max(stored[name] * TOLERANCE, stored[name] + NOISE_FLOOR)
+        assert ratio <= allowed, (
+            f"{name} took {elapsed * 1000:.1f} ms, {ratio:.3f}x the calibration workload; "
+            f"baseline is {stored[name]:.3f}x, at most {allowed:.3f}x allowed"
+        )
+        return result
+
+    return run
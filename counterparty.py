@@ -0,0 +1,105 @@
+"""
+Splits the M-Pesa `Details` column into transaction type, counterparty and account.
+
+    "Customer Transfer to 0712******678 - JOHN DOE"
+        -> ("Customer Transfer", "JOHN DOE", "0712******678")
+    "Pay Bill Online to 888880 - KPLC PREPAID Acc. 37194829"
+        -> ("Pay Bill Online", "KPLC PREPAID", "888880")
+
+Parsing runs once per distinct Details string (statements repeat the same few
+hundred strings thousands of times) and results are memoized across calls. The
+parsed columns are categoricals, so grouping and filtering on them works on
+small integer codes instead of long strings.
+"""
+
+import re
+import threading
+
+import pandas as pd
+
+PARSED_COLUMNS = ['Transaction Type', 'Counterparty', 'Account']
+
+DETAILS_PATTERN = re.compile(
+    r"^(?P<type>.+?)\s+(?:to|from|at agent till|by)\s+"
+    r"(?:-\s*)?(?P<account>\+?\d[\d*xX]{3,})\s*(?:-\s*)?"
+    r"(?P<name>.+?)"
+    r"(?:\s+(?:Acc\.|via\b).*)?$",
+    re.IGNORECASE,
+)
+
+# Unmasked Kenyan phone numbers (07xx, 01xx, 2547xx, +2547xx)
+PHONE_PATTERN = re.compile(r"^(\+?254|0)([17]\d{8})$")
+
+MEMO_LIMIT = 200_000
+
+_memo = {}
+_memo_lock = threading.Lock()
+
+
+def mask_account(account):
+    """Masks an unmasked phone number, keeping the prefix and last three digits; tills pass through."""
+    match = PHONE_PATTERN.match(account)
+    if not match:
+        return account
+    prefix, number = match.groups()
+    return f"{prefix}{number[:3]}{'*' * (len(number) - 6)}{number[-3:]}"
+
+
+def _parse_unique(details):
+    """Vectorized regex extraction over distinct, whitespace-normalized Details strings."""
+    cleaned = details.str.replace(r"\s+", " ", regex=True).str.strip()
+    parts = cleaned.str.extract(DETAILS_PATTERN)
+    matched = parts['name'].notna()
+
+    transaction_type = parts['type'].where(matched, cleaned).str.strip()
+    name = parts['name'].where(matched, cleaned).str.strip().str.upper()
+    account = parts['account'].fillna('').map(mask_account)
+    return list(zip(details, zip(transaction_type, name, account)))
+
+
+def parse_details(details):
+    """
+    Parses a Details series into transaction type, counterparty and account.
+
+    Args:
+    details: Series of raw Details strings.
+
+    Returns:
+    pd.DataFrame: One row per input row with the PARSED_COLUMNS as categoricals.
+    """
+    codes, uniques = pd.factorize(details.astype(str), use_na_sentinel=False)
+    uniques = pd.Index(uniques)
+
+    with _memo_lock:
+        known = {value: _memo[value] for value in uniques if value in _memo}
+    missing = [value for value in uniques if value not in known]
+    if missing:
+        parsed = _parse_unique(pd.Series(missing, dtype=object))
+        known.update(parsed)
+        with _memo_lock:
+            if len(_memo) + len(parsed) > MEMO_LIMIT:
+                _memo.clear()
+            _memo.update(parsed)
+
+    # Read from this call's own results: a full memo may have just been cleared
+    per_unique = [known[value] for value in uniques]
+
+    columns = {}
+    for position, column in enumerate(PARSED_COLUMNS):
+        values = pd.Categorical([parsed[position] for parsed in per_unique])
+        # Expand from one value per distinct Details string to one per row by code
+        columns[column] = pd.Categorical.from_codes(values.codes[codes], categories=values.categories)
+    return pd.DataFrame(columns, index=details.index)
+
+
+def add_counterparty_columns(frame):
+    """Returns `frame` with the parsed Details columns added (or replaced)."""
+    if frame.empty or 'Details' not in frame.columns:
+        return frame
+    parsed = parse_details(frame['Details'])
+    return frame.drop(columns=PARSED_COLUMNS, errors='ignore').join(parsed)
+
+
+def clear_memo():
+    with _memo_lock:
+        _memo.clear()
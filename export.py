@@ -0,0 +1,146 @@
+"""
+Chunked export of transactions and aggregates to CSV, Parquet and Excel.
+
+Nothing is serialized until the user clicks download: the button gets a
+callable, which Streamlit runs on a separate thread. Each writer then walks
+the frame in CHUNK_ROWS slices and writes them straight into a spooled
+temporary file that moves to disk once it grows past SPOOL_MAX_BYTES, so no
+whole-file string or buffer is built on the way. Streamlit serves downloads
+from bytes, so the finished file is read back once, after it is complete.
+pyarrow and xlsxwriter are imported on first use.
+"""
+
+import io
+import tempfile
+
+import streamlit as st
+
+CHUNK_ROWS = 50_000
+SPOOL_MAX_BYTES = 16 * 1024 * 1024
+
+FORMATS = {
+    "CSV": ("csv", "text/csv"),
+    "Parquet": ("parquet", "application/vnd.apache.parquet"),
+    "Excel": ("xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+}
+
+
+def chunks(frame, size=None):
+    """Yields consecutive row slices of `frame` (at least one, so empty frames keep their header)."""
+    size = size or CHUNK_ROWS
+    for start in range(0, max(len(frame), 1), size):
+        yield frame.iloc[start:start + size]
+
+
+def write_csv(frame, out):
+    """Writes `frame` to the binary file `out` as UTF-8 CSV, one chunk at a time."""
+    text = io.TextIOWrapper(out, encoding='utf-8', newline='', write_through=True)
+    for position, chunk in enumerate(chunks(frame)):
+        chunk.to_csv(text, header=position == 0, index=False)
+    # Hand `out` back to the caller open
+    text.detach()
+
+
+def write_parquet(frame, out):
+    """Writes `frame` to `out` as Parquet, one row group per chunk."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    writer = None
+    for chunk in chunks(frame):
+        table = pa.Table.from_pandas(chunk, preserve_index=False)
+        if writer is None:
+            writer = pq.ParquetWriter(out, table.schema)
+        writer.write_table(table.cast(writer.schema))
+    writer.close()
+
+
+def write_xlsx(sheets, out):
+    """
+    Writes each frame of `sheets` ({sheet name: frame}) to its own worksheet.
+
+    xlsxwriter's constant_memory mode flushes every row to a temporary file as
+    soon as the next one starts, so rows are written in order and never held
+    as a whole worksheet in memory.
+    """
+    import xlsxwriter
+
+    workbook = xlsxwriter.Workbook(out, {
+        'constant_memory': True,
+        'default_date_format': 'yyyy-mm-dd hh:mm:ss',
+        'nan_inf_to_errors': True,
+        'remove_timezone': True,
+    })
+    header = workbook.add_format({'bold': True})
+    for name, frame in sheets.items():
+        # Excel limits sheet names to 31 characters
+        worksheet = workbook.add_worksheet(name[:31])
+        worksheet.write_row(0, 0, [str(column) for column in frame.columns], header)
+        row = 1
+        for chunk in chunks(frame):
+            # Object dtype turns NaT into None, which xlsxwriter leaves blank
+            chunk = chunk.astype(object).where(chunk.notna(), None)
+            for values in chunk.itertuples(index=False):
+                worksheet.write_row(row, 0, values)
+                row += 1
+    workbook.close()
+
+
+def serialize(datasets, fmt, selected=None):
+    """
+    Writes datasets in `fmt` to a spooled temporary file, rewound for reading.
+
+    Args:
+    datasets: {name: callable returning a DataFrame}; frames are only built here.
+    fmt: A key of FORMATS.
+    selected: The dataset to write for single-table formats (CSV, Parquet).
+        Excel gets every dataset as its own sheet.
+    """
+    out = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES)
+    if fmt == "Excel":
+        write_xlsx({name: build() for name, build in datasets.items()}, out)
+    elif fmt == "Parquet":
+        write_parquet(datasets[selected](), out)
+    else:
+        write_csv(datasets[selected](), out)
+    out.seek(0)
+    return out
+
+
+def _payload(datasets, fmt, selected):
+    with serialize(datasets, fmt, selected) as out:
+        return out.read()
+
+
+def render_export(datasets, file_stem, key):
+    """
+    Shows format and dataset pickers with a download button that serializes on click.
+
+    Args:
+    datasets: {name: callable returning a DataFrame}, e.g. the filtered
+        transactions and the aggregates behind the page's charts.
+    file_stem: Base name of the downloaded file.
+    key: Prefix for the widget keys.
+    """
+    col1, col2, col3 = st.columns([1, 2, 1])
+    with col1:
+        fmt = st.selectbox("Format:", list(FORMATS), key=f"{key}_export_format")
+    with col2:
+        if fmt == "Excel":
+            selected = None
+            st.caption("The Excel workbook has one sheet per table: " + ", ".join(datasets))
+        else:
+            selected = st.selectbox("Table:", list(datasets), key=f"{key}_export_dataset")
+
+    extension, mime = FORMATS[fmt]
+    if selected:
+        file_stem = f"{file_stem}_{selected.lower().replace(' ', '_')}"
+    with col3:
+        st.download_button(
+            "⬇️ Download",
+            data=lambda: _payload(datasets, fmt, selected),
+            file_name=f"{file_stem}.{extension}",
+            mime=mime,
+            on_click="ignore",
+            key=f"{key}_export_download",
+        )
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Startup benchmark enforcing an import-time budget per page.
+
+For each page, the modules it imports at module level (the ones paid for on
+every cold start, before the first widget renders) are imported in a fresh
+interpreter and timed. The best of a few runs is compared to the page's budget.
+
+Usage:
+    python import_budget.py
+"""
+
+import ast
+import json
+import os
+import subprocess
+import sys
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Milliseconds allowed for a page's module-level imports in a cold interpreter.
+# Streamlit alone accounts for most of it; pandas and plotly for the rest.
+IMPORT_BUDGET_MS = {
+    "mpesa_scr.py": 800,
+    "pages/Analyze_Expenses.py": 1500,
+    "pages/Analyze_Receipts.py": 1500,
+}
+
+# Modules that must only ever be imported lazily, inside the code path using them
+DEFERRED_MODULES = {"tabula", "matplotlib", "seaborn", "xlsxwriter"}
+
+_TIMER = """
+import importlib, json, sys, time
+start = time.perf_counter()
+for name in sys.argv[1:]:
+    importlib.import_module(name)
+print(json.dumps((time.perf_counter() - start) * 1000))
+"""
+
+
+def page_imports(page):
+    """Returns the absolute modules a page imports at module level, in order."""
+    with open(os.path.join(APP_DIR, page), encoding="utf-8") as source:
+        tree = ast.parse(source.read(), filename=page)
+
+    modules = []
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            modules.extend(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.level == 0 and node.module:
+            modules.append(node.module)
+    return list(dict.fromkeys(modules))
+
+
+def measure_import_ms(modules, repeats=3):
+    """Best-of-`repeats` time to import `modules` in a fresh interpreter."""
+    timings = []
+    for _ in range(repeats):
+        output = subprocess.run(
+            [sys.executable, "-c", _TIMER, *modules],
+            cwd=APP_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+        timings.append(json.loads(output.strip().splitlines()[-1]))
+    return min(timings)
+
+
+def check_budgets(repeats=3):
+    """Measures every page and returns one result row per page."""
+    results = []
+    for page, budget in IMPORT_BUDGET_MS.items():
+        modules = page_imports(page)
+        elapsed = measure_import_ms(modules, repeats)
+        results.append({
+            "page": page,
+            "modules": modules,
+            "ms": round(elapsed, 1),
+            "budget_ms": budget,
+            "deferred_violations": sorted({m.split(".")[0] for m in modules} & DEFERRED_MODULES),
+            "ok": elapsed <= budget,
+        })
+    return results
+
+
+def main():
+    print("⏱️ Import-time budget per page")
+    print("=" * 60)
+    failed = False
+    for result in check_budgets():
+        status = "✓" if result["ok"] and not result["deferred_violations"] else "✗"
+        print(f"{status} {result['page']}: {result['ms']:,.0f} ms (budget {result['budget_ms']:,} ms)")
+        print(f"    imports: {', '.join(result['modules'])}")
+        if result["deferred_violations"]:
+            print(f"    must be imported lazily: {', '.join(result['deferred_violations'])}")
+        failed = failed or status == "✗"
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    exit(main())
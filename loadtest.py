@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""
+Headless load-test harness for the dashboard.
+
+Drives the real pages through Streamlit's AppTest with the password gate
+stubbed and a synthetic statement standing in for the uploaded PDF. AppTest
+cannot drive the file uploader, so each simulated session first ingests the
+statement's raw tables itself (table selection, normalization, counterparty
+parsing and the session frames, as the main page does after tabula) into
+frames of its own. It then opens the main page, and filters and searches on
+both analysis pages. Sessions run concurrently in threads; the report covers
+throughput, p50/p99 rerun and ingestion latency and RSS growth.
+
+Usage:
+    python loadtest.py --sessions 8 --rows 5000
+"""
+
+import argparse
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import counterparty
+import perf
+import statement
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+SYNTHETIC_DETAILS = [
+    "Customer Transfer to 0712******678 - JOHN DOE",
+    "Customer Transfer to 0733******412 - MARY WANJIKU",
+    "Merchant Payment to 123456 - NAIVAS SUPERMARKET",
+    "Merchant Payment Online to 5003321 - JAVA HOUSE",
+    "Pay Bill Online to 888880 - KPLC PREPAID Acc. 37194829",
+    "Pay Bill to 247247 - NCBA BANK Acc. 0712345678",
+    "Customer Withdrawal At Agent Till 654321 - MALI AGENCIES",
+    "OD Loan Repayment to 232323 - M-PESA Overdraw",
+    "Airtime Purchase",
+    "Customer Transfer of Funds Charge",
+]
+SYNTHETIC_INCOME = [
+    "Funds received from 0722******123 - JANE DOE",
+    "Funds received from 0711******908 - LEONARD OTIENO",
+    "Business Payment from 303030 - ACME LTD via API",
+    "M-Shwari Withdraw",
+]
+# Transactions per page of the raw tables standing in for the uploaded PDF
+ROWS_PER_PAGE = 50
+
+
+def synthetic_statement(rows, seed=0, start="2023-01-01", days=365):
+    """
+    Builds a normalized statement frame shaped like the one the main page
+    produces after parsing a PDF.
+
+    Args:
+    rows: Number of transactions.
+    seed: Seed for the random generator, so runs are reproducible.
+    start: First day covered by the statement.
+    days: Number of days covered by the statement.
+
+    Returns:
+    pd.DataFrame: Transactions newest first, as they appear on a statement.
+    """
+    rng = np.random.default_rng(seed)
+    offsets = np.sort(rng.integers(0, days * 86400, rows))
+    completion = pd.Timestamp(start) + pd.to_timedelta(offsets, unit="s")
+
+    is_income = rng.random(rows) < 0.3
+    details = np.where(
+        is_income,
+        rng.choice(SYNTHETIC_INCOME, rows),
+        rng.choice(SYNTHETIC_DETAILS, rows),
+    )
+    amounts = np.round(rng.lognormal(mean=6.5, sigma=1.2, size=rows), 2)
+    paid_in = np.where(is_income, amounts, 0.0)
+    withdrawn = np.where(is_income, 0.0, -amounts)
+    balance = np.round(50000 + np.cumsum(paid_in + withdrawn), 2)
+
+    transactions = pd.DataFrame({
+        "Receipt No.": [f"S{seed:02d}{i:08d}" for i in range(rows)],
+        "Completion Time": completion,
+        "Details": details,
+        "Transaction Status": "Completed",
+        "Paid In": paid_in,
+        "Withdrawn": withdrawn,
+        "Balance": balance,
+    })
+    transactions["Month"] = transactions["Completion Time"].dt.month
+    return transactions.iloc[::-1].reset_index(drop=True)
+
+
+def session_frames(transactions):
+    """Builds the session state the main page leaves behind after parsing `transactions`."""
+    return statement.session_frames(counterparty.add_counterparty_columns(transactions))
+
+
+def raw_tables(transactions, rows_per_page=ROWS_PER_PAGE):
+    """The statement as tabula returns it: a summary table, then one text table per page."""
+    text = transactions[statement.TRANSACTION_COLUMNS].astype(str)
+    summary = pd.DataFrame({'TRANSACTION TYPE': ['SEND MONEY', 'PAY BILL'], 'PAID IN': ['0.00', '0.00']})
+    return [summary] + [text.iloc[i:i + rows_per_page] for i in range(0, len(text), rows_per_page)]
+
+
+def ingest(tables):
+    """Runs the main page's post-tabula pipeline on raw `tables` and returns its session state."""
+    selected = statement.tag_pages(statement.select_transaction_tables(tables))
+    transactions = statement.normalize_transactions(pd.concat(selected, ignore_index=True))
+    return session_frames(transactions.drop(columns=statement.PAGE_COLUMN))
+
+
+def _new_app(page, state, timeout):
+    from streamlit.testing.v1 import AppTest
+
+    app = AppTest.from_file(os.path.join(APP_DIR, page), default_timeout=timeout)
+    # Stub the password gate: pretend this session already logged in
+    app.session_state["password_correct"] = True
+    for key, value in state.items():
+        app.session_state[key] = value
+    return app
+
+
+def _timed_run(app, latencies):
+    start = time.perf_counter()
+    app.run()
+    latencies.append((time.perf_counter() - start) * 1000)
+    if app.exception:
+        raise RuntimeError(app.exception[0].message)
+
+
+def simulate_session(tables, search_terms, timeout=60):
+    """
+    Runs one user journey across all pages.
+
+    Returns:
+    tuple: (ingestion time, rerun latencies), in ms.
+    """
+    start = time.perf_counter()
+    with perf.stage("ingest"):
+        state = ingest(tables)
+    ingest_ms = (time.perf_counter() - start) * 1000
+    latencies = []
+
+    main = _new_app("mpesa_scr.py", state, timeout)
+    _timed_run(main, latencies)
+
+    expenses = _new_app("pages/Analyze_Expenses.py", state, timeout)
+    _timed_run(expenses, latencies)
+    expenses.checkbox(key="remove_transactions_checkbox").check()
+    _timed_run(expenses, latencies)
+    expenses.multiselect(key="removed_transactions_multiselect").select("NCBA BANK")
+    _timed_run(expenses, latencies)
+    for term in search_terms:
+        expenses.text_input(key="expense_search_input").input(term)
+        _timed_run(expenses, latencies)
+
+    receipts = _new_app("pages/Analyze_Receipts.py", state, timeout)
+    _timed_run(receipts, latencies)
+    receipts.selectbox(key="chart_type_selector").select("Scatter Plot")
+    _timed_run(receipts, latencies)
+    for term in search_terms:
+        receipts.text_input(key="search_input").input(term)
+        _timed_run(receipts, latencies)
+
+    return ingest_ms, latencies
+
+
+def run_load_test(sessions=4, rows=2000, concurrency=None, search_terms=("NAIVAS", "DOE"), timeout=60):
+    """
+    Simulates `sessions` dashboard sessions, `concurrency` at a time.
+
+    Returns:
+    dict: Session and rerun counts, throughput, latency percentiles and RSS figures.
+    """
+    concurrency = concurrency or sessions
+    # Stands in for the uploaded PDF; every session ingests it into frames of its own
+    tables = raw_tables(synthetic_statement(rows))
+    perf.reset_history()
+
+    latencies, ingest_latencies = [], []
+    latencies_lock = threading.Lock()
+    failures = []
+
+    def one_session(index):
+        try:
+            ingest_ms, session_latencies = simulate_session(tables, search_terms, timeout)
+        except Exception as e:
+            failures.append(f"session {index}: {e}")
+            return
+        with latencies_lock:
+            ingest_latencies.append(ingest_ms)
+            latencies.extend(session_latencies)
+
+    rss_start = perf.current_rss_mb()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one_session, range(sessions)))
+    elapsed = time.perf_counter() - start
+    rss_end = perf.current_rss_mb()
+
+    report = {
+        "sessions": sessions,
+        "concurrency": concurrency,
+        "rows": rows,
+        "reruns": len(latencies),
+        "failures": failures,
+        "elapsed_s": round(elapsed, 2),
+        "throughput_reruns_per_s": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "rss_start_mb": rss_start,
+        "rss_end_mb": rss_end,
+        "rss_growth_mb": round(rss_end - rss_start, 1) if None not in (rss_start, rss_end) else None,
+    }
+    if latencies:
+        report["p50_ms"] = round(perf.percentile(latencies, 50), 1)
+        report["p99_ms"] = round(perf.percentile(latencies, 99), 1)
+    if ingest_latencies:
+        report["ingest_p50_ms"] = round(perf.percentile(ingest_latencies, 50), 1)
+        report["ingest_p99_ms"] = round(perf.percentile(ingest_latencies, 99), 1)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless load test for the M-Pesa dashboard")
+    parser.add_argument("--sessions", type=int, default=4, help="Number of simulated user sessions")
+    parser.add_argument("--concurrency", type=int, default=None, help="Sessions running at once (default: all)")
+    parser.add_argument("--rows", type=int, default=2000, help="Transactions in the synthetic statement")
+    parser.add_argument("--timeout", type=float, default=60, help="Per-rerun timeout in seconds")
+    parser.add_argument("--verbose", action="store_true", help="Keep the per-stage JSON log lines")
+    args = parser.parse_args()
+
+    if not args.verbose:
+        perf.logger.setLevel(logging.WARNING)
+
+    report = run_load_test(args.sessions, args.rows, args.concurrency, timeout=args.timeout)
+
+    print("🧪 M-Pesa Analytics load test")
+    print("=" * 60)
+    for key, value in report.items():
+        if key != "failures":
+            print(f"{key:>26}: {value}")
+    for failure in report["failures"]:
+        print(f"✗ {failure}")
+
+    print("\nSlowest stages (rolling percentiles):")
+    for row in sorted(perf.history_summary(), key=lambda r: r["p99 ms"], reverse=True)[:10]:
+        # Ingestion runs outside any page, as the upload does before the pages open
+        print(f"  {row['page'] or 'upload'}/{row['stage']}: p50 {row['p50 ms']} ms, p99 {row['p99 ms']} ms ({row['calls']} calls)")
+
+    return 1 if report["failures"] else 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -1,6 +1,6 @@
 import streamlit as st
-import time
-import pandas as pd
+import auth
+import perf
 
 st.set_page_config(
     page_title="M-Pesa Analytics Dashboard",
@@ -9,66 +9,10 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+perf.start_rerun("main")
 
-
-import hmac
-import streamlit as st
-
-
-def check_password():
-    """Returns `True` if the user had a correct password."""
-
-    def login_form():
-        """Form with widgets to collect user information"""
-        with st.form("Credentials"):
-            st.text_input("Username", key="username")
-            st.text_input("Password", type="password", key="password")
-            st.form_submit_button("Log in", on_click=password_entered)
-
-    def password_entered():
-        """Checks whether a password entered by the user is correct."""
-        if st.session_state["username"] in st.secrets[
-            "passwords"
-        ] and hmac.compare_digest(
-            st.session_state["password"],
-            st.secrets.passwords[st.session_state["username"]],
-        ):
-            st.session_state["password_correct"] = True
-            del st.session_state["password"]  # Don't store the username or password.
-            del st.session_state["username"]
-        else:
-            st.session_state["password_correct"] = False
-
-    # Return True if the username + password is validated.
-    if st.session_state.get("password_correct", False):
-        return True
-
-    # Show inputs for username + password.
-    login_form()
-    if "password_correct" in st.session_state:
-        st.error("😕 User not known or password incorrect")
-    return False
-
-
-if not check_password():
-    st.stop()
-
-def custom_to_float(value):
-    """
-    Converts a given value to a float.
-
-    Args:
-    value: The value to be converted to a float.
-
-    Returns:
-    float: The converted float value if successful, otherwise returns the original value.
-    """
-    if isinstance(value, str):
-        try:
-            return float(value.replace(',', ''))
-        except ValueError:
-            return value
-    return value
+# Stops here with the login form until this session has logged in
+auth.require_login()
 
 # Main Streamlit app starts here
 st.title("🏦 M-Pesa Analytics Dashboard")
@@ -84,8 +28,6 @@ st.sidebar.markdown("• 💸 Expense Tracking")
 st.sidebar.markdown("• 💰 Income Analysis")
 st.sidebar.markdown("• 📊 Visual Reports")
 
-import tabula
-
 # File upload section
 st.header("📄 Upload Your M-Pesa Statement")
 st.markdown("Please upload your encrypted PDF statement to begin the analysis.")
@@ -103,7 +45,7 @@ with col2:
     statement_duration = st.selectbox(
         'Statement Duration',
         ("1 month", "2+ Months"),
-        help="How long does your statement cover?"
+        help="How long does your statement cover? Longer statements are read a few pages at a time to save memory."
     )
 
 if uploaded_file is not None:
@@ -120,44 +62,88 @@ if uploaded_file is not None:
         
         if passwo and len(passwo.strip()) > 0:
             with st.spinner("🔄 Processing your statement... This may take a few moments."):
+                # Deferred imports: the login and upload screens never need pandas or tabula
+                with perf.stage("import_parsers"):
+                    import pandas as pd
+                    import aggregates
+                    import counterparty
+                    import reconcile
+                    import statement
+
                 try:
-                    tables = tabula.read_pdf(uploaded_file, pages='all', multiple_tables=True, password=passwo)
-                    
-                    if not tables or len(tables) < 3:
-                        st.error("❌ Unable to extract data from the PDF. Please check if the password is correct or if the file format is supported.")
-                        st.stop()
-                    
-                    selected_dfs = []
-                    
-                    for i, df in enumerate(tables[2:]):
-                        if i % 2 == 0:
-                            selected_dfs.append(df)
-                    
-                    if not selected_dfs:
-                        st.error("❌ No transaction data found in the statement.")
-                        st.stop()
-                    
-                    resulting_dataframe = pd.concat(selected_dfs, ignore_index=True)
+                    with perf.stage("count_pages"):
+                        page_count = statement.count_pages(uploaded_file, passwo)
+                    
+                    # Long statements are extracted a batch of pages at a time to keep memory flat
+                    chunked = statement_duration == "2+ Months" or (page_count or 0) > statement.PAGES_PER_BATCH
+                    
+                    if chunked:
+                        batches = []
+                        progress = st.progress(0.0, text="📑 Reading statement pages...")
+                        with perf.stage("read_in_batches"):
+                            for last_page, batch in statement.read_in_batches(uploaded_file, passwo, page_count):
+                                if batch is not None:
+                                    batches.append(batch)
+                                progress.progress(
+                                    min(last_page / page_count, 1.0) if page_count else 0.0,
+                                    text=f"📑 Read {last_page} of {page_count or 'the'} pages..."
+                                )
+                        progress.empty()
+                        
+                        if not batches:
+                            st.error("❌ No transaction data found in the statement.")
+                            st.stop()
+                        
+                        with perf.stage("concat"):
+                            resulting_dataframe = pd.concat(batches, ignore_index=True)
+                            del batches
+                    else:
+                        with perf.stage("tabula.read_pdf"):
+                            tables = statement.read_statement(uploaded_file, passwo)
+                        
+                        if not tables:
+                            st.error("❌ Unable to extract data from the PDF. Please check if the password is correct or if the file format is supported.")
+                            st.stop()
+                        
+                        # Keep only tables whose header matches the transaction table signature
+                        with perf.stage("select_tables"):
+                            selected_dfs = statement.select_transaction_tables(tables)
+                            del tables
+                            # Tags by position are only right with one transaction table per page;
+                            # untagged rows still reconcile, but their pages are not re-extracted
+                            if page_count is None or len(selected_dfs) == page_count:
+                                selected_dfs = statement.tag_pages(selected_dfs)
+                        
+                        if not selected_dfs:
+                            st.error("❌ No transaction data found in the statement.")
+                            st.stop()
+                        
+                        with perf.stage("concat"):
+                            resulting_dataframe = pd.concat(selected_dfs, ignore_index=True)
+                        
+                        with perf.stage("normalize"):
+                            resulting_dataframe = statement.normalize_transactions(resulting_dataframe)
                     
-                    # Clean and process data
-                    if 'Unnamed: 0' in resulting_dataframe.columns:
-                        resulting_dataframe.drop(['Unnamed: 0'], axis=1, inplace=True)
+                    # Check that the balance follows from the transactions; re-read only the pages around gaps
+                    with perf.stage("reconcile"):
+                        balance_gaps = reconcile.find_gaps(resulting_dataframe)
                     
-                    if 'Completion Time' in resulting_dataframe.columns:
-                        resulting_dataframe['Completion Time'] = pd.to_datetime(resulting_dataframe['Completion Time'], errors='coerce')
-                        resulting_dataframe = resulting_dataframe.dropna(subset=['Completion Time'])
-                        resulting_dataframe['Month'] = resulting_dataframe['Completion Time'].dt.month
-                    else:
-                        st.error("❌ Required 'Completion Time' column not found in the statement.")
-                        st.stop()
+                    if not balance_gaps.empty:
+                        with perf.stage("re_extract_pages"):
+                            resulting_dataframe, balance_gaps = reconcile.repair(
+                                resulting_dataframe, uploaded_file, passwo, balance_gaps
+                            )
                     
-                    resulting_dataframe = resulting_dataframe.fillna(0)
+                    if not balance_gaps.empty:
+                        st.warning(f"⚠️ {len(balance_gaps)} gap(s) found in the running balance. Some transactions may be missing, so totals could be incomplete.")
+                        with st.expander("🧾 Balance gaps"):
+                            st.dataframe(balance_gaps, use_container_width=True, hide_index=True)
                     
-                    # Apply custom float conversion with error handling
-                    for col in ['Paid In', 'Withdrawn', 'Balance']:
-                        if col in resulting_dataframe.columns:
-                            resulting_dataframe[col] = resulting_dataframe[col].apply(custom_to_float)
+                    resulting_dataframe = resulting_dataframe.drop(columns=reconcile.PAGE_COLUMN, errors='ignore')
                     
+                    with perf.stage("parse_counterparties"):
+                        resulting_dataframe = counterparty.add_counterparty_columns(resulting_dataframe)
+
                     total_paid = abs(resulting_dataframe['Withdrawn'].sum()) if 'Withdrawn' in resulting_dataframe.columns else 0
                     total_received = resulting_dataframe['Paid In'].sum() if 'Paid In' in resulting_dataframe.columns else 0
                     
@@ -200,29 +186,19 @@ if uploaded_file is not None:
                             hide_index=True
                         )
                     
-                    # Process withdrawal and receipt data
-                    withdrawals = resulting_dataframe[resulting_dataframe['Withdrawn'] != 0].copy() if 'Withdrawn' in resulting_dataframe.columns else pd.DataFrame()
-                    received = resulting_dataframe[resulting_dataframe['Paid In'] != 0].copy() if 'Paid In' in resulting_dataframe.columns else pd.DataFrame()
+                    with perf.stage("split_and_precompute"):
+                        # Process withdrawal and receipt data, precomputing what the analysis pages reuse
+                        session_entries = statement.session_frames(resulting_dataframe)
                     
-                    if not withdrawals.empty:
-                        withdrawals.loc[:, 'Withdrawn'] = withdrawals.loc[:, 'Withdrawn'] * -1
-                        withdrawals.loc[:, 'Day of Month'] = withdrawals['Completion Time'].dt.day
-                        
+                    if 'expense_aggregates' in session_entries:
                         st.subheader("💸 Top Spending Categories")
-                        top_expenses = withdrawals.groupby('Details')['Withdrawn'].sum().sort_values(ascending=False).head(10)
+                        top_expenses = aggregates.excluding(session_entries['expense_aggregates'], top_n=10)['top']
                         
-                        if not top_expenses.empty:
-                            for i, (category, amount) in enumerate(top_expenses.items(), 1):
-                                st.write(f"{i}. **{category}**: Ksh {amount:,.0f}")
-                    
-                    if not received.empty:
-                        received.loc[:, 'Day of Month'] = received['Completion Time'].dt.day
+                        for i, (category, amount) in enumerate(top_expenses.itertuples(index=False), 1):
+                            st.write(f"{i}. **{category}**: Ksh {amount:,.0f}")
                     
                     # Store data in session state for analysis pages
-                    if not withdrawals.empty:
-                        st.session_state['Withdrawals'] = withdrawals
-                    if not received.empty:
-                        st.session_state['received'] = received
+                    st.session_state.update(session_entries)
                     
                     st.info("📈 Use the sidebar to navigate to 'Analyze Expenses' or 'Analyze Receipts' for detailed analysis!")
                     
@@ -240,5 +216,4 @@ if uploaded_file is not None:
 else:
     st.info("👆 Please upload your M-Pesa PDF statement to begin analysis.")
 
-
-
+perf.render_admin_panel()
@@ -1,8 +1,14 @@
 import streamlit as st
-import pandas as pd
-import matplotlib.pyplot as plt
 import plotly.express as px
-from datetime import datetime, date
+import aggregates
+import auth
+import export
+import perf
+import query_engine
+import recurring
+import rollups
+import statement
+import widget_meta
 
 # Configure page
 st.set_page_config(
@@ -11,6 +17,9 @@ st.set_page_config(
     layout="wide"
 )
 
+perf.start_rerun("expenses")
+auth.require_login()
+
 st.title("💸 Expense Analysis")
 st.markdown("Analyze your spending patterns and identify your top expense categories.")
 
@@ -28,11 +37,6 @@ def init_session_state():
 
 init_session_state()
 
-# Function to format values for autopct
-def func(pct, allvalues):
-    absolute = round(pct/100.*sum(allvalues), 2)
-    return f"{absolute}\n({pct:.1f}%)"
-
 # Check if data is available
 if 'Withdrawals' not in st.session_state:
     st.error("❌ No expense data found!")
@@ -40,20 +44,20 @@ if 'Withdrawals' not in st.session_state:
     st.stop()
 
 try:
-    withdrawals = st.session_state['Withdrawals'].copy()
+    with perf.stage("prepare"):
+        withdrawals = st.session_state['Withdrawals']
     
-    if withdrawals.empty:
-        st.warning("⚠️ No withdrawal transactions found in your statement.")
-        st.stop()
+        if withdrawals.empty:
+            st.warning("⚠️ No withdrawal transactions found in your statement.")
+            st.stop()
     
-    # Add date column safely
-    if 'Completion Time' in withdrawals.columns:
-        withdrawals['date'] = withdrawals['Completion Time'].dt.date
-        withdrawals['weekday'] = withdrawals['Completion Time'].dt.day_name()
-        withdrawals['year_month'] = withdrawals['Completion Time'].dt.to_period('M').astype(str)
-    else:
-        st.error("❌ Date information missing from transaction data.")
-        st.stop()
+        if 'Completion Time' not in withdrawals.columns:
+            st.error("❌ Date information missing from transaction data.")
+            st.stop()
+
+        # Calendar columns are added at upload; older sessions get them once here
+        if not set(statement.CALENDAR_COLUMNS) <= set(withdrawals.columns):
+            withdrawals = st.session_state['Withdrawals'] = statement.add_calendar_columns(withdrawals)
 
     # Transaction filtering options (with session state)
     st.sidebar.header("🔧 Filter Options")
@@ -66,137 +70,178 @@ try:
     )
     st.session_state.expense_remove_transactions = remove
     
-    if remove:
-        available_options = ["MALI", "LEONARD","NCBA"]
-        # Find available patterns in the data
-        for pattern in available_options:
-            if withdrawals['Details'].str.contains(pattern, case=False, na=False).any():
-                continue
+    # Per-counterparty contributions are precomputed at upload; exclusions subtract from them
+    if 'expense_aggregates' not in st.session_state:
+        st.session_state['expense_aggregates'] = aggregates.contributions(st.session_state['Withdrawals'], 'Withdrawn')
+    expense_contributions = st.session_state['expense_aggregates']
+    if 'expense_widget_meta' not in st.session_state:
+        st.session_state['expense_widget_meta'] = widget_meta.describe(st.session_state['Withdrawals'], 'Withdrawn')
+    expense_meta = st.session_state['expense_widget_meta']
+    removed_transactions = []
+    
+    with perf.stage("remove_filter"):
+        if remove:
+            # Offer parsed counterparties, biggest spend first, instead of hardcoded substrings
+            available_options = expense_contributions['groups'].tolist()
+            option_counts = expense_meta['counts']
         
-        removed_transactions = st.sidebar.multiselect(
-            "Select transaction types to remove:",
-            options=available_options,
-            default=st.session_state.expense_removed_list,
-            help="Remove specific transaction types from analysis",
-            key="removed_transactions_multiselect"
-        )
-        st.session_state.expense_removed_list = removed_transactions
+            removed_transactions = st.sidebar.multiselect(
+                "Select counterparties to remove:",
+                options=available_options,
+                default=[option for option in st.session_state.expense_removed_list if option in option_counts],
+                format_func=lambda option: f"{option} ({option_counts.get(option, 0):,})",
+                help="Remove all transactions with these counterparties from analysis",
+                key="removed_transactions_multiselect"
+            )
+            st.session_state.expense_removed_list = removed_transactions
 
-        if removed_transactions:
-            pattern = '|'.join(removed_transactions)
-            condition_to_remove = withdrawals['Details'].str.contains(pattern, case=False, na=False)
-            withdrawals = withdrawals[~condition_to_remove]
-            
-            if withdrawals.empty:
-                st.warning("⚠️ All transactions have been filtered out. Please adjust your filters.")
-                st.stop()
+        expense_aggregates = aggregates.excluding(expense_contributions, removed_transactions)
+        if expense_aggregates['count'] == 0:
+            st.warning("⚠️ All transactions have been filtered out. Please adjust your filters.")
+            st.stop()
+
+        # Views that list individual transactions apply the exclusion in their own query
+        exclusion = {'exclude': {'Counterparty': removed_transactions}} if removed_transactions else {}
 
     # Display summary metrics
     st.header("📊 Expense Summary")
-    col1, col2, col3 = st.columns(3)
+    with perf.stage("summary_metrics"):
+        col1, col2, col3 = st.columns(3)
     
-    with col1:
-        total_expenses = withdrawals['Withdrawn'].sum()
-        st.metric(
-            label="💸 Total Expenses", 
-            value=f"Ksh {total_expenses:,.0f}"
-        )
+        with col1:
+            total_expenses = expense_aggregates['total']
+            st.metric(
+                label="💸 Total Expenses", 
+                value=f"Ksh {total_expenses:,.0f}"
+            )
     
-    with col2:
-        avg_transaction = withdrawals['Withdrawn'].mean()
-        st.metric(
-            label="📊 Average Transaction", 
-            value=f"Ksh {avg_transaction:,.0f}"
-        )
+        with col2:
+            avg_transaction = expense_aggregates['mean']
+            st.metric(
+                label="📊 Average Transaction", 
+                value=f"Ksh {avg_transaction:,.0f}"
+            )
     
-    with col3:
-        num_transactions = len(withdrawals)
-        st.metric(
-            label="🔢 Total Transactions", 
-            value=f"{num_transactions:,}"
-        )
+        with col3:
+            num_transactions = expense_aggregates['count']
+            st.metric(
+                label="🔢 Total Transactions", 
+                value=f"{num_transactions:,}"
+            )
 
-    analysis_tabs = st.tabs(["Overview", "Weekday View"])
+    analysis_tabs = st.tabs(["Overview", "Weekday View", "Amount Distribution", "Period Comparison", "Recurring"])
 
     with analysis_tabs[0]:
-        st.subheader("📈 Daily Spending Pattern")
-        if 'Day of Month' in withdrawals.columns:
-            daily_expense = pd.DataFrame(withdrawals.groupby('Day of Month')['Withdrawn'].sum()).reset_index()
+        with perf.stage("overview_tab"):
+            st.subheader("📈 Daily Spending Pattern")
+            if 'Day of Month' in withdrawals.columns:
+                daily_expense = expense_aggregates['daily']
             
-            if not daily_expense.empty:
-                st.line_chart(data=daily_expense, x='Day of Month', y='Withdrawn', use_container_width=True)
+                if not daily_expense.empty:
+                    st.line_chart(data=daily_expense, x='Day of Month', y='Withdrawn', use_container_width=True)
+                else:
+                    st.info("No daily expense data available.")
             else:
-                st.info("No daily expense data available.")
-        else:
-            st.info("Day of month details are not available for this statement.")
+                st.info("Day of month details are not available for this statement.")
     
-        st.subheader("🎯 Top Expense Categories")
-        details_data = pd.DataFrame(withdrawals.groupby('Details')['Withdrawn'].sum().sort_values(ascending=False)).iloc[0:15].reset_index()
+            st.subheader("🎯 Top Expense Categories")
+            details_data = expense_aggregates['top']
 
-        if not details_data.empty:
-            details_data = details_data.sort_values(by='Withdrawn', ascending=False)
-
-            # Bar chart
-            fig = px.bar(
-                details_data, 
-                x='Details', 
-                y='Withdrawn', 
-                title='Top 15 Expense Categories',
-                labels={'Withdrawn': 'Amount Spent (Ksh)', 'Details': 'Expense Categories'},
-                color='Withdrawn',
-                color_continuous_scale='Reds'
-            )
+            if not details_data.empty:
+                # Bar chart
+                fig = px.bar(
+                    details_data, 
+                    x='Counterparty', 
+                    y='Withdrawn', 
+                    title='Top 15 Expense Categories',
+                    labels={'Withdrawn': 'Amount Spent (Ksh)', 'Counterparty': 'Expense Categories'},
+                    color='Withdrawn',
+                    color_continuous_scale='Reds'
+                )
 
-            fig.update_layout(width=900, height=500, showlegend=False)
-            fig.update_xaxes(showticklabels=False)
-            st.plotly_chart(fig, use_container_width=True)
+                fig.update_layout(width=900, height=500, showlegend=False)
+                fig.update_xaxes(showticklabels=False)
+                st.plotly_chart(fig, use_container_width=True)
 
-            # Pie chart
-            pie_fig = px.pie(
-                details_data, 
-                values='Withdrawn', 
-                names="Details",
-                title="Expense Distribution"
-            )
-            pie_fig.update_layout(width=900, height=500, showlegend=False)
-            st.plotly_chart(pie_fig, use_container_width=True)
-        else:
-            st.info("No expense categories to display.")
+                # Pie chart
+                pie_fig = px.pie(
+                    details_data, 
+                    values='Withdrawn', 
+                    names="Counterparty",
+                    title="Expense Distribution"
+                )
+                pie_fig.update_layout(width=900, height=500, showlegend=False)
+                st.plotly_chart(pie_fig, use_container_width=True)
+            else:
+                st.info("No expense categories to display.")
 
     with analysis_tabs[1]:
-        st.subheader("📅 Weekday Expense Analysis")
-        week_days = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
-        selected_weekday = st.selectbox("Select a weekday:", week_days, index=0)
-
-        month_options = sorted(withdrawals['year_month'].dropna().unique().tolist())
-        if month_options:
-            default_index = len(month_options) - 1
-            selected_month = st.selectbox("Select a month:", month_options, index=default_index)
-            month_filtered = withdrawals[withdrawals['year_month'] == selected_month]
+        with perf.stage("weekday_tab"):
+            st.subheader("📅 Weekday Expense Analysis")
+            week_days = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+            selected_weekday = st.selectbox("Select a weekday:", week_days, index=0)
 
-            weekday_transactions = month_filtered[month_filtered['weekday'] == selected_weekday]
+            month_options = sorted(withdrawals['year_month'].dropna().unique().tolist())
+            if month_options:
+                default_index = len(month_options) - 1
+                selected_month = st.selectbox("Select a month:", month_options, index=default_index)
+                weekday_transactions = query_engine.filter_frame(
+                    withdrawals, equals={'year_month': selected_month, 'weekday': selected_weekday}, **exclusion
+                )
 
-            if not weekday_transactions.empty:
-                total_weekday = weekday_transactions['Withdrawn'].sum()
-                avg_weekday = weekday_transactions['Withdrawn'].mean()
-                count_weekday = len(weekday_transactions)
-                st.metric(label=f"Total {selected_weekday} Spending", value=f"Ksh {total_weekday:,.0f}")
-                st.metric(label=f"Average {selected_weekday} Transaction", value=f"Ksh {avg_weekday:,.0f}")
-                st.metric(label=f"Total {selected_weekday} Transactions", value=f"{count_weekday:,}")
+                if not weekday_transactions.empty:
+                    total_weekday = weekday_transactions['Withdrawn'].sum()
+                    avg_weekday = weekday_transactions['Withdrawn'].mean()
+                    count_weekday = len(weekday_transactions)
+                    st.metric(label=f"Total {selected_weekday} Spending", value=f"Ksh {total_weekday:,.0f}")
+                    st.metric(label=f"Average {selected_weekday} Transaction", value=f"Ksh {avg_weekday:,.0f}")
+                    st.metric(label=f"Total {selected_weekday} Transactions", value=f"{count_weekday:,}")
 
-                weekday_by_date = (weekday_transactions.groupby('date')['Withdrawn'].sum().reset_index().sort_values('date'))
-                st.bar_chart(data=weekday_by_date, x='date', y='Withdrawn', use_container_width=True)
+                    weekday_by_date = query_engine.daily_totals(weekday_transactions, 'Withdrawn')
+                    st.bar_chart(data=weekday_by_date, x='date', y='Withdrawn', use_container_width=True)
 
-                st.subheader(f"Transactions on {selected_weekday}s in {selected_month}")
-                st.dataframe(
-                    weekday_transactions[['date', 'Details', 'Withdrawn']].sort_values(by='date'),
-                    use_container_width=True,
-                    hide_index=True
-                )
+                    st.subheader(f"Transactions on {selected_weekday}s in {selected_month}")
+                    st.dataframe(
+                        weekday_transactions[['date', 'Details', 'Withdrawn']].sort_values(by='date'),
+                        use_container_width=True,
+                        hide_index=True
+                    )
+                else:
+                    st.info(f"No {selected_weekday} transactions found for {selected_month}.")
             else:
-                st.info(f"No {selected_weekday} transactions found for {selected_month}.")
-        else:
-            st.info("No month information available for weekday analysis.")
+                st.info("No month information available for weekday analysis.")
+
+    with analysis_tabs[2]:
+        with perf.stage("distribution"):
+            st.subheader("📊 Spending Amount Distribution")
+            # Bins counted per counterparty at upload; removed counterparties are subtracted
+            expense_histogram = widget_meta.histogram_excluding(expense_meta['histogram'], removed_transactions)
+            expense_edges = expense_histogram['edges'].tolist()
+            expense_amount_range = st.select_slider(
+                "Highlight amount range (Ksh):",
+                options=expense_edges,
+                value=(expense_edges[0], expense_edges[-1]),
+                format_func=widget_meta.format_amount,
+                key="expense_amount_range"
+            )
+            widget_meta.render_distribution(expense_histogram, "Payments", selected=expense_amount_range)
+
+    with analysis_tabs[3]:
+        with perf.stage("period_comparison"):
+            st.subheader("📆 Period-over-Period Spending")
+            if 'period_rollups' not in st.session_state:
+                st.session_state['period_rollups'] = rollups.build_rollups(withdrawals=st.session_state['Withdrawals'])
+            rollups.render_comparison(
+                st.session_state['period_rollups'], 'spend', "Spending", key="expense_compare",
+                exclude=removed_transactions
+            )
+
+    with analysis_tabs[4]:
+        with perf.stage("recurring"):
+            st.subheader("🔁 Recurring Payments")
+            if 'recurring_expenses' not in st.session_state:
+                st.session_state['recurring_expenses'] = recurring.detect(st.session_state['Withdrawals'], 'Withdrawn')
+            recurring.render_recurring(st.session_state['recurring_expenses'], "Payments")
 
     # Search and filter transactions
     st.header("🔍 Transaction Search & Filter")
@@ -204,67 +249,97 @@ try:
     col1, col2 = st.columns(2)
     
     with col1:
-        spent_on = st.text_input(
-            'Search transactions containing:', 
-            value=st.session_state.expense_search_term,
-            help="Enter keywords to search in transaction details",
-            key="expense_search_input"
-        )
+        with perf.stage("search"):
+            spent_on = st.text_input(
+                'Search transactions containing:', 
+                value=st.session_state.expense_search_term,
+                help="Enter keywords to search in transaction details",
+                key="expense_search_input"
+            )
         
-        # Update session state when input changes
-        if spent_on != st.session_state.expense_search_term:
-            st.session_state.expense_search_term = spent_on
+            # Update session state when input changes
+            if spent_on != st.session_state.expense_search_term:
+                st.session_state.expense_search_term = spent_on
         
-        if spent_on and len(spent_on.strip()) > 0:
-            try:
-                # Use original data for search (not filtered data)
-                original_withdrawals = st.session_state['Withdrawals'].copy()
-                matching_transactions = original_withdrawals[original_withdrawals['Details'].str.contains(spent_on, na=False, case=False)]
+            if spent_on and len(spent_on.strip()) > 0:
+                try:
+                    # Use original data for search (not filtered data)
+                    original_withdrawals = st.session_state['Withdrawals']
+                    matching_transactions = query_engine.search(original_withdrawals, 'Details', spent_on)
                 
-                if not matching_transactions.empty:
-                    total_spent = matching_transactions['Withdrawn'].sum()
-                    st.success(f"💰 Total spent on '{spent_on}': **Ksh {total_spent:,.0f}**")
-                    st.dataframe(matching_transactions, use_container_width=True, hide_index=True)
-                else:
-                    st.info(f"No transactions found containing '{spent_on}'")
+                    if not matching_transactions.empty:
+                        total_spent = matching_transactions['Withdrawn'].sum()
+                        st.success(f"💰 Total spent on '{spent_on}': **Ksh {total_spent:,.0f}**")
+                        st.dataframe(matching_transactions.drop(columns=statement.CALENDAR_COLUMNS, errors='ignore'),
+                                     use_container_width=True, hide_index=True)
+                    else:
+                        st.info(f"No transactions found containing '{spent_on}'")
                     
-            except Exception as e:
-                st.error(f"Error searching transactions: {str(e)}")
+                except Exception as e:
+                    st.error(f"Error searching transactions: {str(e)}")
     
     with col2:
-        # Get default date from session state or use today's date
-        default_date = st.session_state.expense_date_filter if st.session_state.expense_date_filter else date.today()
+        with perf.stage("date_filter"):
+            # Default to the saved date, kept inside the statement's date range
+            default_date = widget_meta.clamp_date(st.session_state.expense_date_filter, expense_meta)
         
-        date_filter = st.date_input(
-            'View transactions for specific date:',
-            value=default_date,
-            help="Select a date to view all transactions for that day",
-            key="expense_date_input"
-        )
+            date_filter = st.date_input(
+                'View transactions for specific date:',
+                value=default_date,
+                min_value=expense_meta['date_min'],
+                max_value=expense_meta['date_max'],
+                help="Select a date to view all transactions for that day",
+                key="expense_date_input"
+            )
         
-        # Update session state
-        st.session_state.expense_date_filter = date_filter
+            # Update session state
+            st.session_state.expense_date_filter = date_filter
         
-        if date_filter is not None:
-            try:
-                # Use original data for date filtering
-                original_withdrawals = st.session_state['Withdrawals'].copy()
-                if 'Completion Time' in original_withdrawals.columns:
-                    original_withdrawals['date'] = original_withdrawals['Completion Time'].dt.date
-                    date_transactions = original_withdrawals[original_withdrawals['date'] == date_filter]
+            if date_filter is not None:
+                try:
+                    # Use original data for date filtering
+                    original_withdrawals = st.session_state['Withdrawals']
+                    if 'Completion Time' in original_withdrawals.columns:
+                        date_transactions = query_engine.filter_frame(original_withdrawals, dates=(date_filter, date_filter))
                     
-                    if not date_transactions.empty:
-                        daily_total = date_transactions['Withdrawn'].sum()
-                        st.success(f"💸 Total spent on {date_filter}: **Ksh {daily_total:,.0f}**")
-                        st.dataframe(date_transactions, use_container_width=True, hide_index=True)
+                        if not date_transactions.empty:
+                            daily_total = date_transactions['Withdrawn'].sum()
+                            st.success(f"💸 Total spent on {date_filter}: **Ksh {daily_total:,.0f}**")
+                            st.dataframe(date_transactions.drop(columns=statement.CALENDAR_COLUMNS, errors='ignore'),
+                                         use_container_width=True, hide_index=True)
+                        else:
+                            st.info(f"No transactions found for {date_filter}")
                     else:
-                        st.info(f"No transactions found for {date_filter}")
-                else:
-                    st.warning("Date information not available for filtering.")
+                        st.warning("Date information not available for filtering.")
                     
-            except Exception as e:
-                st.error(f"Error filtering by date: {str(e)}")
+                except Exception as e:
+                    st.error(f"Error filtering by date: {str(e)}")
+
+    # Export what the page shows: transactions without removed counterparties and their aggregates
+    st.header("📤 Export")
+    with perf.stage("export"):
+        export.render_export(
+            {
+                "Transactions": lambda: (query_engine.filter_frame(withdrawals, **exclusion) if exclusion else withdrawals)
+                    .drop(columns=statement.CALENDAR_COLUMNS),
+                "Counterparty Totals": lambda: query_engine.group_totals(withdrawals, 'Counterparty', 'Withdrawn', **exclusion),
+                "Daily Totals": lambda: query_engine.daily_totals(withdrawals, 'Withdrawn', **exclusion),
+            },
+            file_stem="mpesa_expenses",
+            key="expense"
+        )
+
+    query_engine.render_sql_box(
+        {name: st.session_state[key] for name, key in (('withdrawals', 'Withdrawals'), ('received', 'received')) if key in st.session_state},
+        default_sql=(
+            "SELECT strftime(\"Completion Time\", '%Y-%m') AS month, Counterparty, SUM(Withdrawn) AS spent\n"
+            "FROM withdrawals GROUP BY ALL ORDER BY month, spent DESC"
+        ),
+        key="expense"
+    )
 
 except Exception as e:
     st.error(f"❌ An error occurred while processing expense data: {str(e)}")
     st.error("Please try refreshing the page or re-uploading your statement.")
+
+perf.render_admin_panel()
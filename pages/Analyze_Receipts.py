@@ -1,7 +1,13 @@
 import streamlit as st
-import pandas as pd
 import plotly.express as px
-from datetime import datetime, date
+import auth
+import export
+import perf
+import query_engine
+import recurring
+import rollups
+import statement
+import widget_meta
 
 # Configure page
 st.set_page_config(
@@ -10,6 +16,9 @@ st.set_page_config(
     layout="wide"
 )
 
+perf.start_rerun("receipts")
+auth.require_login()
+
 st.title("💰 Income Analysis")
 st.markdown("Analyze your income sources and track money received over time.")
 
@@ -40,314 +49,370 @@ if 'received' not in st.session_state:
     st.stop()
 
 try:
-    received = st.session_state['received'].copy()
+    with perf.stage("prepare"):
+        received = st.session_state['received']
     
-    if received.empty:
-        st.warning("⚠️ No income transactions found in your statement.")
-        st.stop()
+        if received.empty:
+            st.warning("⚠️ No income transactions found in your statement.")
+            st.stop()
+
+        # Calendar columns are added at upload; older sessions get them once here
+        if 'Completion Time' in received.columns and not set(statement.CALENDAR_COLUMNS) <= set(received.columns):
+            received = st.session_state['received'] = statement.add_calendar_columns(received)
 
-    # Add date column safely for filtering
-    if 'Completion Time' in received.columns:
-        received['date'] = received['Completion Time'].dt.date
+        # Option lists and bounds for the widgets, summarized once at upload
+        if 'income_widget_meta' not in st.session_state:
+            st.session_state['income_widget_meta'] = widget_meta.describe(st.session_state['received'], 'Paid In')
+        income_meta = st.session_state['income_widget_meta']
     
-    # Dynamic Filter Controls in Sidebar
-    st.sidebar.header("🎛️ Dynamic Chart Controls")
+    with perf.stage("sidebar_filters"):
+        # Dynamic Filter Controls in Sidebar
+        st.sidebar.header("🎛️ Dynamic Chart Controls")
     
-    # Chart type selector
-    chart_types = ["Bar Chart", "Pie Chart", "Line Chart", "Scatter Plot"]
-    st.session_state.revenue_chart_type = st.sidebar.selectbox(
-        "📊 Select Chart Type:",
-        chart_types,
-        index=chart_types.index(st.session_state.revenue_chart_type),
-        key="chart_type_selector"
-    )
+        # Chart type selector
+        chart_types = ["Bar Chart", "Pie Chart", "Line Chart", "Scatter Plot"]
+        st.session_state.revenue_chart_type = st.sidebar.selectbox(
+            "📊 Select Chart Type:",
+            chart_types,
+            index=chart_types.index(st.session_state.revenue_chart_type),
+            key="chart_type_selector"
+        )
     
-    # Date range filter
-    if 'date' in received.columns:
-        min_date = received['date'].min()
-        max_date = received['date'].max()
+        # Date range filter
+        if 'Completion Time' in received.columns:
+            min_date = income_meta['date_min']
+            max_date = income_meta['date_max']
         
-        st.sidebar.subheader("📅 Date Range Filter")
-        date_range = st.sidebar.date_input(
-            "Select date range:",
-            value=(min_date, max_date),
-            min_value=min_date,
-            max_value=max_date,
-            key="date_range_selector"
-        )
+            st.sidebar.subheader("📅 Date Range Filter")
+            date_range = st.sidebar.date_input(
+                "Select date range:",
+                value=(min_date, max_date),
+                min_value=min_date,
+                max_value=max_date,
+                key="date_range_selector"
+            )
         
-        # Apply date filter
-        if len(date_range) == 2:
-            start_date, end_date = date_range
-            received = received[(received['date'] >= start_date) & (received['date'] <= end_date)]
+            # Apply date filter
+            if len(date_range) == 2:
+                start_date, end_date = date_range
+                received = query_engine.filter_frame(received, dates=(start_date, end_date))
     
-    # Amount range filter
-    if 'Paid In' in received.columns:
-        min_amount = float(received['Paid In'].min())
-        max_amount = float(received['Paid In'].max())
+        # Amount range filter over the log-spaced bin edges computed at upload
+        amount_range = None
+        if 'Paid In' in received.columns:
+            amount_histogram = income_meta['histogram']
+            amount_edges = amount_histogram['edges'].tolist()
         
-        st.sidebar.subheader("💰 Amount Range Filter")
-        amount_range = st.sidebar.slider(
-            "Select amount range (Ksh):",
-            min_value=min_amount,
-            max_value=max_amount,
-            value=(min_amount, max_amount),
-            step=100.0,
-            key="amount_range_selector"
-        )
+            st.sidebar.subheader("💰 Amount Range Filter")
+            amount_range = st.sidebar.select_slider(
+                "Select amount range (Ksh):",
+                options=amount_edges,
+                value=(amount_edges[0], amount_edges[-1]),
+                format_func=widget_meta.format_amount,
+                key="amount_range_selector"
+            )
+            in_range = widget_meta.histogram_range(amount_histogram, *amount_range)
+            st.sidebar.caption(f"{in_range['count']:,} of the statement's transactions (Ksh {in_range['total']:,.0f}) fall in this range")
         
-        # Apply amount filter
-        received = received[(received['Paid In'] >= amount_range[0]) & 
-                          (received['Paid In'] <= amount_range[1])]
+            # Apply amount filter; the full range keeps every row
+            if amount_range != (amount_edges[0], amount_edges[-1]):
+                received = query_engine.filter_frame(received, intervals={'Paid In': amount_range})
     
-    # Income source filter
-    if 'Details' in received.columns and not received.empty:
-        available_sources = received['Details'].unique().tolist()
-        st.sidebar.subheader("🏷️ Income Source Filter")
-        selected_sources = st.sidebar.multiselect(
-            "Select specific income sources:",
-            options=available_sources,
-            default=st.session_state.revenue_selected_sources if st.session_state.revenue_selected_sources else available_sources[:10],
-            key="source_selector"
-        )
+        # Income source filter
+        if 'Counterparty' in received.columns and not received.empty:
+            # Most frequent sources first, with their transaction counts
+            available_sources = income_meta['options']
+            source_counts = income_meta['counts']
+            saved_sources = [source for source in st.session_state.revenue_selected_sources if source in source_counts]
+            st.sidebar.subheader("🏷️ Income Source Filter")
+            selected_sources = st.sidebar.multiselect(
+                "Select specific income sources:",
+                options=available_sources,
+                default=saved_sources if saved_sources else available_sources[:10],
+                format_func=lambda source: f"{source} ({source_counts[source]:,})",
+                key="source_selector"
+            )
         
-        if selected_sources:
-            received = received[received['Details'].isin(selected_sources)]
-            st.session_state.revenue_selected_sources = selected_sources
+            if selected_sources:
+                received = query_engine.filter_frame(received, include={'Counterparty': selected_sources})
+                st.session_state.revenue_selected_sources = selected_sources
     
-    # Top N results filter
-    st.session_state.revenue_show_top_n = st.sidebar.slider(
-        "📈 Number of top results to show:",
-        min_value=5,
-        max_value=50,
-        value=st.session_state.revenue_show_top_n,
-        step=5,
-        key="top_n_selector"
-    )
+        # Top N results filter
+        st.session_state.revenue_show_top_n = st.sidebar.slider(
+            "📈 Number of top results to show:",
+            min_value=5,
+            max_value=50,
+            value=st.session_state.revenue_show_top_n,
+            step=5,
+            key="top_n_selector"
+        )
 
     # Display summary metrics
     st.header("📊 Income Summary")
-    col1, col2, col3 = st.columns(3)
+    with perf.stage("summary_metrics"):
+        col1, col2, col3 = st.columns(3)
+        income_summary = query_engine.summary(received, 'Paid In')
     
-    with col1:
-        total_income = received['Paid In'].sum()
-        st.metric(
-            label="💰 Total Income", 
-            value=f"Ksh {total_income:,.0f}"
-        )
+        with col1:
+            total_income = income_summary['total']
+            st.metric(
+                label="💰 Total Income", 
+                value=f"Ksh {total_income:,.0f}"
+            )
     
-    with col2:
-        avg_income = received['Paid In'].mean()
-        st.metric(
-            label="📊 Average Transaction", 
-            value=f"Ksh {avg_income:,.0f}"
-        )
+        with col2:
+            avg_income = income_summary['mean']
+            st.metric(
+                label="📊 Average Transaction", 
+                value=f"Ksh {avg_income:,.0f}"
+            )
     
-    with col3:
-        num_transactions = len(received)
-        st.metric(
-            label="🔢 Total Transactions", 
-            value=f"{num_transactions:,}"
-        )
+        with col3:
+            num_transactions = income_summary['count']
+            st.metric(
+                label="🔢 Total Transactions", 
+                value=f"{num_transactions:,}"
+            )
 
     # Dynamic Charts Section
-    st.subheader("🎯 Dynamic Income Analysis")
+    with perf.stage("dynamic_chart"):
+        st.subheader("🎯 Dynamic Income Analysis")
     
-    if not received.empty:
-        # Prepare data based on current filters
-        details_data = pd.DataFrame(
-            received.groupby('Details')['Paid In'].sum().sort_values(ascending=False)
-        ).iloc[0:st.session_state.revenue_show_top_n].reset_index()
+        if not received.empty:
+            # Prepare data based on current filters
+            details_data = query_engine.group_totals(
+                received, 'Counterparty', 'Paid In', limit=st.session_state.revenue_show_top_n
+            )
         
-        if not details_data.empty:
-            details_data = details_data.sort_values(by='Paid In', ascending=False)
-            
-            # Create dynamic chart based on selected type
-            if st.session_state.revenue_chart_type == "Bar Chart":
-                fig = px.bar(
-                    details_data, 
-                    x='Details', 
-                    y='Paid In', 
-                    title=f'Top {st.session_state.revenue_show_top_n} Income Sources - Bar Chart',
-                    labels={'Paid In': 'Amount Received (Ksh)', 'Details': 'Income Sources'},
-                    color='Paid In',
-                    color_continuous_scale='Greens'
-                )
-                fig.update_xaxes(showticklabels=False)
-                
-            elif st.session_state.revenue_chart_type == "Pie Chart":
-                fig = px.pie(
-                    details_data, 
-                    values='Paid In', 
-                    names="Details",
-                    title=f"Income Source Distribution - Top {st.session_state.revenue_show_top_n}"
-                )
-                
-            elif st.session_state.revenue_chart_type == "Line Chart":
-                # For line chart, use daily income data
-                if 'date' in received.columns:
-                    daily_data = received.groupby('date')['Paid In'].sum().reset_index()
-                    daily_data = daily_data.sort_values('date')
-                    fig = px.line(
-                        daily_data,
-                        x='date',
-                        y='Paid In',
-                        title='Daily Income Trend',
-                        labels={'Paid In': 'Amount Received (Ksh)', 'date': 'Date'}
+            if not details_data.empty:
+                # Create dynamic chart based on selected type
+                if st.session_state.revenue_chart_type == "Bar Chart":
+                    fig = px.bar(
+                        details_data, 
+                        x='Counterparty', 
+                        y='Paid In', 
+                        title=f'Top {st.session_state.revenue_show_top_n} Income Sources - Bar Chart',
+                        labels={'Paid In': 'Amount Received (Ksh)', 'Counterparty': 'Income Sources'},
+                        color='Paid In',
+                        color_continuous_scale='Greens'
                     )
-                else:
-                    # Fallback to source-based line chart
-                    fig = px.line(
-                        details_data.reset_index(), 
-                        x='index', 
-                        y='Paid In',
-                        title=f'Income Sources Trend - Top {st.session_state.revenue_show_top_n}',
-                        labels={'Paid In': 'Amount Received (Ksh)', 'index': 'Rank'}
+                    fig.update_xaxes(showticklabels=False)
+                
+                elif st.session_state.revenue_chart_type == "Pie Chart":
+                    fig = px.pie(
+                        details_data, 
+                        values='Paid In', 
+                        names="Counterparty",
+                        title=f"Income Source Distribution - Top {st.session_state.revenue_show_top_n}"
                     )
+                
+                elif st.session_state.revenue_chart_type == "Line Chart":
+                    # For line chart, use daily income data
+                    if 'Completion Time' in received.columns:
+                        daily_data = query_engine.daily_totals(received, 'Paid In')
+                        fig = px.line(
+                            daily_data,
+                            x='date',
+                            y='Paid In',
+                            title='Daily Income Trend',
+                            labels={'Paid In': 'Amount Received (Ksh)', 'date': 'Date'}
+                        )
+                    else:
+                        # Fallback to source-based line chart
+                        fig = px.line(
+                            details_data.reset_index(), 
+                            x='index', 
+                            y='Paid In',
+                            title=f'Income Sources Trend - Top {st.session_state.revenue_show_top_n}',
+                            labels={'Paid In': 'Amount Received (Ksh)', 'index': 'Rank'}
+                        )
                     
-            elif st.session_state.revenue_chart_type == "Scatter Plot":
-                # Create scatter plot with amount vs frequency
-                source_stats = received.groupby('Details').agg({
-                    'Paid In': ['sum', 'count', 'mean']
-                }).round(2)
-                source_stats.columns = ['Total_Amount', 'Frequency', 'Average_Amount']
-                source_stats = source_stats.reset_index()
-                source_stats = source_stats.head(st.session_state.revenue_show_top_n)
+                elif st.session_state.revenue_chart_type == "Scatter Plot":
+                    # Create scatter plot with amount vs frequency
+                    source_stats = query_engine.group_stats(
+                        received, 'Counterparty', 'Paid In', limit=st.session_state.revenue_show_top_n
+                    )
                 
-                fig = px.scatter(
-                    source_stats,
-                    x='Frequency',
-                    y='Total_Amount',
-                    size='Average_Amount',
-                    hover_data=['Details'],
-                    title=f'Income Sources Analysis: Frequency vs Total Amount - Top {st.session_state.revenue_show_top_n}',
-                    labels={
-                        'Frequency': 'Number of Transactions',
-                        'Total_Amount': 'Total Amount Received (Ksh)',
-                        'Average_Amount': 'Average Amount (Ksh)'
-                    }
-                )
+                    fig = px.scatter(
+                        source_stats,
+                        x='Frequency',
+                        y='Total_Amount',
+                        size='Average_Amount',
+                        hover_data=['Counterparty'],
+                        title=f'Income Sources Analysis: Frequency vs Total Amount - Top {st.session_state.revenue_show_top_n}',
+                        labels={
+                            'Frequency': 'Number of Transactions',
+                            'Total_Amount': 'Total Amount Received (Ksh)',
+                            'Average_Amount': 'Average Amount (Ksh)'
+                        }
+                    )
             
-            # Update layout and display chart
-            fig.update_layout(width=900, height=500, showlegend=False)
-            st.plotly_chart(fig, use_container_width=True)
+                # Update layout and display chart
+                fig.update_layout(width=900, height=500, showlegend=False)
+                st.plotly_chart(fig, use_container_width=True)
             
-            # Display filtered data summary
-            col1, col2, col3 = st.columns(3)
-            with col1:
-                filtered_total = received['Paid In'].sum()
-                st.metric("💰 Filtered Total Income", f"Ksh {filtered_total:,.0f}")
-            with col2:
-                filtered_count = len(received)
-                st.metric("🔢 Filtered Transactions", f"{filtered_count:,}")
-            with col3:
-                filtered_avg = received['Paid In'].mean() if not received.empty else 0
-                st.metric("📊 Filtered Average", f"Ksh {filtered_avg:,.0f}")
+                # Display filtered data summary
+                col1, col2, col3 = st.columns(3)
+                with col1:
+                    filtered_total = income_summary['total']
+                    st.metric("💰 Filtered Total Income", f"Ksh {filtered_total:,.0f}")
+                with col2:
+                    filtered_count = income_summary['count']
+                    st.metric("🔢 Filtered Transactions", f"{filtered_count:,}")
+                with col3:
+                    filtered_avg = income_summary['mean']
+                    st.metric("📊 Filtered Average", f"Ksh {filtered_avg:,.0f}")
+            else:
+                st.info("No data available for the selected filters.")
         else:
-            st.info("No data available for the selected filters.")
-    else:
-        st.warning("No income data available after applying filters.")
+            st.warning("No income data available after applying filters.")
 
     # Original static daily income chart (kept for comparison)
-    st.subheader("📈 Daily Income Pattern")
-    if 'Day of Month' in received.columns:
-        daily_income = pd.DataFrame(received.groupby('Day of Month')['Paid In'].sum()).reset_index()
+    with perf.stage("daily_pattern"):
+        st.subheader("📈 Daily Income Pattern")
+        if 'Day of Month' in received.columns:
+            daily_income = query_engine.group_totals(received, 'Day of Month', 'Paid In', order='key')
         
-        if not daily_income.empty:
-            st.line_chart(data=daily_income, x='Day of Month', y='Paid In', use_container_width=True)
-        else:
-            st.info("No daily income data available.")
+            if not daily_income.empty:
+                st.line_chart(data=daily_income, x='Day of Month', y='Paid In', use_container_width=True)
+            else:
+                st.info("No daily income data available.")
 
     # Top income sources (kept as additional view)
-    st.subheader("🎯 Top Income Sources")
-    details_data = pd.DataFrame(received.groupby('Details')['Paid In'].sum().sort_values(ascending=False)).iloc[0:15].reset_index()
+    with perf.stage("top_sources"):
+        st.subheader("🎯 Top Income Sources")
+        details_data = query_engine.group_totals(received, 'Counterparty', 'Paid In', limit=15)
 
-    if not details_data.empty:
-        details_data = details_data.sort_values(by='Paid In', ascending=False)
+        if not details_data.empty:
+            # Bar chart
+            fig = px.bar(
+                details_data, 
+                x='Counterparty', 
+                y='Paid In', 
+                title='Top 15 Income Sources',
+                labels={'Paid In': 'Amount Received (Ksh)', 'Counterparty': 'Income Sources'},
+                color='Paid In',
+                color_continuous_scale='Greens'
+            )
 
-        # Bar chart
-        fig = px.bar(
-            details_data, 
-            x='Details', 
-            y='Paid In', 
-            title='Top 15 Income Sources',
-            labels={'Paid In': 'Amount Received (Ksh)', 'Details': 'Income Sources'},
-            color='Paid In',
-            color_continuous_scale='Greens'
-        )
+            fig.update_layout(width=900, height=500, showlegend=False)
+            fig.update_xaxes(showticklabels=False)
+            st.plotly_chart(fig, use_container_width=True)
+
+            # Pie chart for income distribution
+            pie_fig = px.pie(
+                details_data, 
+                values='Paid In', 
+                names="Counterparty",
+                title="Income Source Distribution"
+            )
+            pie_fig.update_layout(width=900, height=500, showlegend=False)
+            st.plotly_chart(pie_fig, use_container_width=True)
+        else:
+            st.info("No income sources to display.")
 
-        fig.update_layout(width=900, height=500, showlegend=False)
-        fig.update_xaxes(showticklabels=False)
-        st.plotly_chart(fig, use_container_width=True)
+    # Where amounts cluster, from the bins counted at upload
+    with perf.stage("distribution"):
+        st.subheader("📊 Income Amount Distribution")
+        widget_meta.render_distribution(income_meta['histogram'], "Receipts", selected=amount_range)
 
-        # Pie chart for income distribution
-        pie_fig = px.pie(
-            details_data, 
-            values='Paid In', 
-            names="Details",
-            title="Income Source Distribution"
-        )
-        pie_fig.update_layout(width=900, height=500, showlegend=False)
-        st.plotly_chart(pie_fig, use_container_width=True)
-    else:
-        st.info("No income sources to display.")
+    # Period-over-period comparison from the rollups built at upload
+    with perf.stage("period_comparison"):
+        st.subheader("📆 Period-over-Period Income")
+        if 'period_rollups' not in st.session_state:
+            st.session_state['period_rollups'] = rollups.build_rollups(received=st.session_state['received'])
+        rollups.render_comparison(st.session_state['period_rollups'], 'income', "Income", key="revenue_compare")
+
+    # Regular income such as salary, detected at upload
+    with perf.stage("recurring"):
+        st.subheader("🔁 Recurring Income")
+        if 'recurring_income' not in st.session_state:
+            st.session_state['recurring_income'] = recurring.detect(st.session_state['received'], 'Paid In')
+        recurring.render_recurring(st.session_state['recurring_income'], "Income")
 
     # Search specific income sources (with session state)
     st.header("🔍 Income Source Search")
     
-    # Use session state for search term
-    received_from = st.text_input(
-        'Search income from specific source:', 
-        value=st.session_state.revenue_search_term,
-        help="Enter keywords to search for specific income sources",
-        key="search_input"
-    )
+    with perf.stage("search"):
+        # Use session state for search term
+        received_from = st.text_input(
+            'Search income from specific source:', 
+            value=st.session_state.revenue_search_term,
+            help="Enter keywords to search for specific income sources",
+            key="search_input"
+        )
     
-    # Update session state when input changes
-    if received_from != st.session_state.revenue_search_term:
-        st.session_state.revenue_search_term = received_from
+        # Update session state when input changes
+        if received_from != st.session_state.revenue_search_term:
+            st.session_state.revenue_search_term = received_from
     
-    if received_from and len(received_from.strip()) > 0:
-        try:
-            # Use the original received data for search (not filtered data)
-            original_received = st.session_state['received'].copy()
-            matching_transactions = original_received[original_received['Details'].str.contains(received_from, na=False, case=False)]
+        if received_from and len(received_from.strip()) > 0:
+            try:
+                # Use the original received data for search (not filtered data)
+                original_received = st.session_state['received']
+                matching_transactions = query_engine.search(original_received, 'Details', received_from)
             
-            if not matching_transactions.empty:
-                total_received_from = matching_transactions['Paid In'].sum()
-                # Get the most common source name for display
-                source_name = matching_transactions['Details'].iloc[0] if len(matching_transactions) > 0 else received_from
+                if not matching_transactions.empty:
+                    total_received_from = matching_transactions['Paid In'].sum()
+                    # Get the most common source name for display
+                    source_name = matching_transactions['Details'].iloc[0] if len(matching_transactions) > 0 else received_from
                 
-                st.success(f"💰 Total received from sources containing '{received_from}': **Ksh {total_received_from:,.0f}**")
-                st.dataframe(matching_transactions, use_container_width=True, hide_index=True)
-            else:
-                st.info(f"No income transactions found containing '{received_from}'")
+                    st.success(f"💰 Total received from sources containing '{received_from}': **Ksh {total_received_from:,.0f}**")
+                    st.dataframe(matching_transactions.drop(columns=statement.CALENDAR_COLUMNS, errors='ignore'),
+                                 use_container_width=True, hide_index=True)
+                else:
+                    st.info(f"No income transactions found containing '{received_from}'")
                 
-        except Exception as e:
-            st.error(f"Error searching income sources: {str(e)}")
+            except Exception as e:
+                st.error(f"Error searching income sources: {str(e)}")
 
     # Recent transactions table
-    st.subheader("📋 Recent Income Transactions")
-    if not received.empty:
-        # Sort by completion time if available
-        if 'Completion Time' in received.columns:
-            recent_transactions = received.sort_values('Completion Time', ascending=False).head(20)
-        else:
-            recent_transactions = received.head(20)
+    with perf.stage("recent_transactions"):
+        st.subheader("📋 Recent Income Transactions")
+        if not received.empty:
+            # Sort by completion time if available
+            if 'Completion Time' in received.columns:
+                recent_transactions = received.sort_values('Completion Time', ascending=False).head(20)
+            else:
+                recent_transactions = received.head(20)
         
-        st.dataframe(
-            recent_transactions[['Completion Time', 'Details', 'Paid In']].rename(columns={
-                'Completion Time': 'Date & Time',
-                'Details': 'Source',
-                'Paid In': 'Amount (Ksh)'
-            }) if 'Completion Time' in recent_transactions.columns else recent_transactions[['Details', 'Paid In']].rename(columns={
-                'Details': 'Source',
-                'Paid In': 'Amount (Ksh)'
-            }),
-            use_container_width=True,
-            hide_index=True
+            st.dataframe(
+                recent_transactions[['Completion Time', 'Details', 'Paid In']].rename(columns={
+                    'Completion Time': 'Date & Time',
+                    'Details': 'Source',
+                    'Paid In': 'Amount (Ksh)'
+                }) if 'Completion Time' in recent_transactions.columns else recent_transactions[['Details', 'Paid In']].rename(columns={
+                    'Details': 'Source',
+                    'Paid In': 'Amount (Ksh)'
+                }),
+                use_container_width=True,
+                hide_index=True
+            )
+
+    # Export the transactions left by the sidebar filters and their aggregates
+    st.header("📤 Export")
+    with perf.stage("export"):
+        export.render_export(
+            {
+                "Transactions": lambda: received.drop(columns=statement.CALENDAR_COLUMNS, errors='ignore'),
+                "Income Sources": lambda: query_engine.group_stats(received, 'Counterparty', 'Paid In'),
+                "Daily Totals": lambda: query_engine.daily_totals(received, 'Paid In'),
+            },
+            file_stem="mpesa_income",
+            key="revenue"
         )
 
+    query_engine.render_sql_box(
+        {name: st.session_state[key] for name, key in (('received', 'received'), ('withdrawals', 'Withdrawals')) if key in st.session_state},
+        default_sql=(
+            "SELECT Counterparty, COUNT(*) AS payments, SUM(\"Paid In\") AS total\n"
+            "FROM received GROUP BY ALL ORDER BY total DESC LIMIT 20"
+        ),
+        key="revenue"
+    )
+
 except Exception as e:
     st.error(f"❌ An error occurred while processing income data: {str(e)}")
     st.error("Please try refreshing the page or re-uploading your statement.")
+
+perf.render_admin_panel()
@@ -0,0 +1,161 @@
+"""
+Per-stage timing and memory instrumentation for the dashboard pages.
+
+Wrap a hot-path section in ``with perf.stage("name"):`` to time it. Every
+stage emits one JSON log line on the ``mpesa.perf`` logger, is added to the
+current rerun's breakdown and feeds a process-wide rolling history used for
+percentiles. Append ``?perf=1`` to the URL (or set ``MPESA_PERF_PANEL=1``) to
+show the admin panel in the sidebar.
+"""
+
+import json
+import logging
+import math
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+
+import streamlit as st
+
+HISTORY_SIZE = 500
+PERCENTILES = (50, 90, 99)
+
+logger = logging.getLogger("mpesa.perf")
+if not logger.handlers:
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(_handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+# Rolling durations shared by every session served by this process
+_history = defaultdict(lambda: deque(maxlen=HISTORY_SIZE))
+_history_lock = threading.Lock()
+
+try:
+    _PAGE_SIZE_MB = os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+except (AttributeError, ValueError, OSError):
+    _PAGE_SIZE_MB = None
+
+
+def current_rss_mb():
+    """Returns the resident set size of this process in MB, or None if unknown."""
+    if _PAGE_SIZE_MB is not None:
+        try:
+            with open("/proc/self/statm") as statm:
+                return int(statm.read().split()[1]) * _PAGE_SIZE_MB
+        except (OSError, IndexError, ValueError):
+            pass
+    try:
+        import resource
+        # Peak rather than current RSS, but the best we have off Linux
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    except ImportError:
+        return None
+
+
+def _rerun_state():
+    try:
+        return st.session_state.get("_perf_rerun")
+    except Exception:
+        # Outside a Streamlit script run (tests, benchmarks)
+        return None
+
+
+def start_rerun(page):
+    """Starts a fresh per-rerun breakdown for `page`."""
+    try:
+        st.session_state["_perf_rerun"] = {"page": page, "stages": []}
+    except Exception:
+        pass
+
+
+@contextmanager
+def stage(name):
+    """Times the wrapped block and records it as stage `name`."""
+    rerun = _rerun_state()
+    page = rerun["page"] if rerun else None
+    rss_before = current_rss_mb()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        rss_after = current_rss_mb()
+        record = {
+            "event": "stage",
+            "page": page,
+            "stage": name,
+            "ms": round(elapsed_ms, 3),
+            "rss_mb": round(rss_after, 1) if rss_after is not None else None,
+            "rss_delta_mb": round(rss_after - rss_before, 2) if None not in (rss_before, rss_after) else None,
+        }
+        logger.info(json.dumps(record))
+        if rerun is not None:
+            rerun["stages"].append(record)
+        with _history_lock:
+            _history[(page, name)].append(elapsed_ms)
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of `values` (which must be non-empty)."""
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+def history_summary():
+    """Returns one row per (page, stage) with call count and rolling percentiles."""
+    with _history_lock:
+        snapshot = {key: list(values) for key, values in _history.items()}
+
+    rows = []
+    for (page, name), values in sorted(snapshot.items(), key=lambda item: (str(item[0][0]), item[0][1])):
+        if not values:
+            continue
+        row = {"page": page, "stage": name, "calls": len(values)}
+        for pct in PERCENTILES:
+            row[f"p{pct} ms"] = round(percentile(values, pct), 2)
+        rows.append(row)
+    return rows
+
+
+def reset_history():
+    """Clears the rolling history (used by tests and the load-test harness)."""
+    with _history_lock:
+        _history.clear()
+
+
+def panel_enabled():
+    if os.environ.get("MPESA_PERF_PANEL") == "1":
+        return True
+    try:
+        return st.query_params.get("perf") == "1"
+    except Exception:
+        return False
+
+
+def render_admin_panel():
+    """Shows the hidden sidebar panel with this rerun's breakdown and rolling percentiles."""
+    if not panel_enabled():
+        return
+
+    rerun = _rerun_state()
+    with st.sidebar.expander("⏱️ Performance (admin)", expanded=False):
+        if rerun and rerun["stages"]:
+            total_ms = sum(record["ms"] for record in rerun["stages"])
+            st.caption(f"This rerun of {rerun['page']}: {total_ms:,.1f} ms across {len(rerun['stages'])} stages")
+            st.dataframe(
+                [{key: record[key] for key in ("stage", "ms", "rss_mb", "rss_delta_mb")} for record in rerun["stages"]],
+                use_container_width=True,
+                hide_index=True
+            )
+        else:
+            st.caption("No stages recorded in this rerun.")
+
+        summary = history_summary()
+        if summary:
+            st.caption(f"Rolling percentiles (last {HISTORY_SIZE} calls per stage, all sessions)")
+            st.dataframe(summary, use_container_width=True, hide_index=True)
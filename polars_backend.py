@@ -0,0 +1,114 @@
+"""
+Optional Polars engine for normalization and aggregation.
+
+Set ``MPESA_BACKEND=polars`` to run the CPU-heavy steps (date and amount
+parsing, calendar labels, group sums) as lazy Polars query plans, which use
+every core. Each function takes and returns pandas objects, so the pages are
+unchanged and the pandas code paths stay the default and the reference:
+test_polars_backend.py checks that both engines agree. Without polars
+installed, the pandas paths are used whatever the setting.
+"""
+
+import importlib.util
+import logging
+import os
+
+import pandas as pd
+
+BACKEND_ENV = "MPESA_BACKEND"
+
+logger = logging.getLogger("mpesa.backend")
+_warned = False
+
+
+def enabled():
+    """Whether MPESA_BACKEND selects Polars and Polars is installed."""
+    global _warned
+    if os.environ.get(BACKEND_ENV, "pandas").strip().lower() != "polars":
+        return False
+    if importlib.util.find_spec("polars") is None:
+        if not _warned:
+            logger.warning("%s=polars but polars is not installed; using pandas", BACKEND_ENV)
+            _warned = True
+        return False
+    return True
+
+
+def _to_pandas(lazy, index=None):
+    frame = lazy.collect().to_pandas()
+    if index is not None:
+        frame = frame.set_index(index)
+        frame.index.name = None
+    return frame
+
+
+def normalize_transactions(frame, amount_columns, text_columns=()):
+    """
+    Polars version of statement.normalize_transactions.
+
+    Parses 'Completion Time', drops rows without one, adds 'Month' and turns
+    `amount_columns` into floats, with missing amounts as 0 and missing
+    `text_columns` cells as ''. Rows keep their original index.
+    """
+    import polars as pl
+
+    amounts = [col for col in amount_columns if col in frame.columns]
+    text = [col for col in text_columns if col in frame.columns]
+    index = "__index"
+    plan = (
+        pl.from_pandas(frame.reset_index(names=index)).lazy()
+        .with_columns(pl.col('Completion Time').cast(pl.String).str.to_datetime(strict=False))
+        .filter(pl.col('Completion Time').is_not_null())
+        .with_columns(
+            pl.col('Completion Time').dt.month().cast(pl.Int32).alias('Month'),
+            *[
+                pl.col(col).cast(pl.String).str.replace_all(",", "", literal=True)
+                  .cast(pl.Float64, strict=False).fill_null(0.0)
+                for col in amounts
+            ],
+            *[pl.col(col).cast(pl.String).fill_null("") for col in text],
+        )
+    )
+    return _to_pandas(plan, index)
+
+
+def calendar_columns(times):
+    """Weekday names and 'YYYY-MM' labels of `times`, as a DataFrame with the same index."""
+    import polars as pl
+
+    plan = pl.LazyFrame({'t': pl.from_pandas(times)}).select(
+        pl.col('t').dt.strftime('%A').alias('weekday'),
+        pl.col('t').dt.strftime('%Y-%m').alias('year_month'),
+    )
+    return _to_pandas(plan).set_axis(times.index)
+
+
+def period_keys(times, granularity):
+    """Polars version of rollups.period_keys."""
+    import polars as pl
+
+    t = pl.col('t')
+    key = t.dt.strftime('%Y-%m') if granularity == "month" else t.dt.truncate('1w').dt.strftime('%Y-%m-%d')
+    plan = pl.LazyFrame({'t': pl.from_pandas(times)}).select(key.alias('period'))
+    return _to_pandas(plan)['period'].set_axis(times.index).rename(times.name)
+
+
+def group_sums(frame, by, value):
+    """
+    Sum and count of `value` for each combination of the `by` columns.
+
+    Returns:
+    pd.DataFrame: 'sum' and 'count' columns on a (Multi)Index of `by`, sorted
+        by key like a pandas groupby.
+    """
+    import polars as pl
+
+    data = {col: frame[col].astype(str) if isinstance(frame[col].dtype, pd.CategoricalDtype) else frame[col] for col in by}
+    data[value] = frame[value]
+    plan = (
+        pl.from_pandas(pd.DataFrame(data)).lazy()
+        .group_by(by)
+        .agg(pl.col(value).sum().alias('sum'), pl.len().alias('count'))
+        .sort(by)
+    )
+    return _to_pandas(plan).set_index(by)
@@ -0,0 +1,244 @@
+"""
+Embedded SQL engine (DuckDB) behind the filter and aggregation layer of both pages.
+
+Frames are registered as DuckDB views over the pandas data (no copy), so every
+slice and aggregate runs as one vectorized, multi-threaded query instead of a
+chain of eager pandas steps. Row filters return positions that are applied to
+the original frame with ``iloc``, which keeps its index and dtypes intact.
+
+The page queries share one sandboxed database: external file access is
+disabled and its configuration locked. Each query runs on its own cursor, whose
+registered views are private to it, and only the columns a query needs are
+registered. The power-user SQL box accepts exactly one SELECT statement and
+runs it in a fresh sandboxed database of its own, which is dropped afterwards,
+so nothing a user runs is visible to other sessions.
+"""
+
+import threading
+
+import numpy as np
+import streamlit as st
+
+ROW_ID = '__row'
+SQL_TIMEOUT_S = 10
+SQL_MAX_ROWS = 5000
+
+
+def quote(identifier):
+    """Quotes a column or table name for use in SQL."""
+    return '"' + str(identifier).replace('"', '""') + '"'
+
+
+_database = None
+_database_lock = threading.Lock()
+
+
+def _sandboxed_database():
+    import duckdb
+
+    database = duckdb.connect()
+    database.execute("SET enable_external_access = false")
+    database.execute("SET lock_configuration = true")
+    return database
+
+
+def _connect(tables, isolated=False):
+    global _database
+    if isolated:
+        con = _sandboxed_database()
+    else:
+        with _database_lock:
+            if _database is None:
+                _database = _sandboxed_database()
+            con = _database.cursor()
+    for name, frame in tables.items():
+        con.register(name, frame)
+    return con
+
+
+def _filter_columns(equals=None, include=None, exclude=None, ranges=None, intervals=None, dates=None, contains=None):
+    columns = [*(equals or {}), *(include or {}), *(exclude or {}), *(ranges or {}), *(intervals or {}), *(contains or {})]
+    if dates is not None:
+        columns.append('Completion Time')
+    return columns
+
+
+def _project(frame, *columns, filters=None):
+    """Keeps only the columns a query reads, so DuckDB never scans the rest."""
+    wanted = [*columns, *_filter_columns(**(filters or {}))]
+    return frame[list(dict.fromkeys(c for c in wanted if c in frame.columns))]
+
+
+def query(tables, sql, params=None, timeout=None, isolated=False):
+    """
+    Runs `sql` over the given frames and returns the result as a DataFrame.
+
+    Args:
+    tables: Mapping of view name to DataFrame.
+    sql: The query; use ``?`` placeholders for values.
+    params: Values for the placeholders.
+    timeout: Seconds after which the query is interrupted.
+    isolated: Run in a fresh database instead of the shared one.
+    """
+    con = _connect(tables, isolated)
+    timer = threading.Timer(timeout, con.interrupt) if timeout else None
+    try:
+        if timer:
+            timer.start()
+        return con.execute(sql, params or []).df()
+    finally:
+        if timer:
+            timer.cancel()
+        con.close()
+
+
+def _where(equals=None, include=None, exclude=None, ranges=None, intervals=None, dates=None, contains=None):
+    """Builds a parameterized WHERE clause from simple filter specs."""
+    clauses, params = [], []
+    for column, value in (equals or {}).items():
+        clauses.append(f"{quote(column)} = ?")
+        params.append(value)
+    for column, values in (include or {}).items():
+        clauses.append(f"{quote(column)} IN (SELECT unnest(?))")
+        params.append(list(values))
+    for column, values in (exclude or {}).items():
+        clauses.append(f"{quote(column)} NOT IN (SELECT unnest(?))")
+        params.append(list(values))
+    for column, (low, high) in (ranges or {}).items():
+        clauses.append(f"{quote(column)} BETWEEN ? AND ?")
+        params.extend([low, high])
+    for column, (low, high) in (intervals or {}).items():
+        clauses.append(f"{quote(column)} >= ? AND {quote(column)} < ?")
+        params.extend([low, high])
+    if dates is not None:
+        clauses.append('CAST("Completion Time" AS DATE) BETWEEN ? AND ?')
+        params.extend(dates)
+    for column, term in (contains or {}).items():
+        # Literal substring match; cheaper than ILIKE and needs no escaping
+        clauses.append(f"contains(lower(CAST({quote(column)} AS VARCHAR)), ?)")
+        params.append(term.lower())
+    return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+
+def filter_frame(frame, **filters):
+    """
+    Returns the rows of `frame` matching all filters.
+
+    Filters: equals={col: value}, include={col: values}, exclude={col: values},
+    ranges={col: (low, high)}, intervals={col: (low, high)} (high excluded),
+    dates=(first_day, last_day) on 'Completion Time',
+    contains={col: substring} (case-insensitive, literal).
+    """
+    if frame.empty:
+        return frame
+    where, params = _where(**filters)
+    if not where:
+        return frame
+    rows = query(
+        {'t': _project(frame, filters=filters).assign(**{ROW_ID: np.arange(len(frame))})},
+        f"SELECT {ROW_ID} FROM t{where} ORDER BY {ROW_ID}",
+        params,
+    )
+    return frame.iloc[rows[ROW_ID].to_numpy()]
+
+
+def search(frame, column, term):
+    """Rows whose `column` contains `term`, case-insensitively."""
+    return filter_frame(frame, contains={column: term})
+
+
+def group_totals(frame, by, value, limit=None, order='value', **filters):
+    """
+    Sums `value` per `by` group, as a two-column DataFrame.
+
+    Args:
+    order: 'value' for largest total first, 'key' for ascending group keys.
+    limit: Keep only the first `limit` groups.
+    """
+    where, params = _where(**filters)
+    order_by = f"{quote(value)} DESC" if order == 'value' else "1"
+    sql = (
+        f"SELECT {quote(by)}, SUM({quote(value)}) AS {quote(value)} FROM t{where} "
+        f"GROUP BY 1 ORDER BY {order_by}"
+    )
+    if limit:
+        sql += f" LIMIT {int(limit)}"
+    return query({'t': _project(frame, by, value, filters=filters)}, sql, params)
+
+
+def daily_totals(frame, value, **filters):
+    """Sums `value` per calendar day of 'Completion Time', in date order, as columns 'date' and `value`."""
+    where, params = _where(**filters)
+    return query(
+        {'t': _project(frame, 'Completion Time', value, filters=filters)},
+        f'SELECT CAST("Completion Time" AS DATE) AS date, SUM({quote(value)}) AS {quote(value)} '
+        f"FROM t{where} GROUP BY 1 ORDER BY 1",
+        params,
+    )
+
+
+def group_stats(frame, by, value, limit=None, **filters):
+    """Total, count and mean of `value` per `by` group, largest total first."""
+    where, params = _where(**filters)
+    sql = (
+        f"SELECT {quote(by)}, ROUND(SUM({quote(value)}), 2) AS Total_Amount, COUNT(*) AS Frequency, "
+        f"ROUND(AVG({quote(value)}), 2) AS Average_Amount FROM t{where} GROUP BY 1 ORDER BY 2 DESC"
+    )
+    if limit:
+        sql += f" LIMIT {int(limit)}"
+    return query({'t': _project(frame, by, value, filters=filters)}, sql, params)
+
+
+def summary(frame, value, **filters):
+    """Total, mean and count of `value` over the filtered rows, as a dict."""
+    where, params = _where(**filters)
+    row = query(
+        {'t': _project(frame, value, filters=filters)},
+        f"SELECT COALESCE(SUM({quote(value)}), 0) AS total, AVG({quote(value)}) AS mean, COUNT(*) AS count FROM t{where}",
+        params,
+    ).iloc[0]
+    return {'total': float(row['total']), 'mean': float(row['mean']) if row['count'] else 0.0, 'count': int(row['count'])}
+
+
+def single_select(sql):
+    """
+    The text of `sql` if it is exactly one SELECT statement.
+
+    Raises:
+    ValueError: For anything else, e.g. several statements or a CREATE.
+    """
+    import duckdb
+
+    statements = duckdb.extract_statements(sql)
+    if len(statements) != 1 or statements[0].type != duckdb.StatementType.SELECT:
+        raise ValueError("Only a single SELECT statement can be run here.")
+    return statements[0].query.strip().rstrip(';')
+
+
+def run_user_sql(tables, sql):
+    """
+    Runs a power-user query with a timeout and a row cap.
+
+    Returns:
+    tuple: (result DataFrame, whether it was truncated to SQL_MAX_ROWS)
+    """
+    capped = f"SELECT * FROM ({single_select(sql)}) AS user_query LIMIT {SQL_MAX_ROWS + 1}"
+    result = query(tables, capped, timeout=SQL_TIMEOUT_S, isolated=True)
+    truncated = len(result) > SQL_MAX_ROWS
+    return result.head(SQL_MAX_ROWS), truncated
+
+
+def render_sql_box(tables, default_sql, key):
+    """Shows the power-user SQL expander over `tables`."""
+    with st.expander("🧮 SQL query (advanced)"):
+        st.caption("Tables: " + ", ".join(f"`{name}` ({', '.join(map(str, frame.columns))})" for name, frame in tables.items()))
+        sql = st.text_area("SQL", value=default_sql, key=f"{key}_sql", height=120)
+        if st.button("Run query", key=f"{key}_sql_run") and sql.strip():
+            try:
+                result, truncated = run_user_sql(tables, sql)
+            except Exception as e:
+                st.error(f"Query failed: {str(e)}")
+            else:
+                if truncated:
+                    st.warning(f"Showing the first {SQL_MAX_ROWS:,} rows.")
+                st.dataframe(result, use_container_width=True, hide_index=True)
@@ -0,0 +1,133 @@
+"""
+Balance reconciliation of extracted statements.
+
+Every completed transaction moves the running balance by exactly its 'Paid In'
+plus its (negative) 'Withdrawn' amount. In chronological order, the balance
+minus the cumulative sum of those movements is therefore constant, and any step
+in it marks rows that tabula dropped or mangled between two transactions. Each
+row carries the page it was extracted from, so only the pages around a gap are
+re-extracted, with tabula's lattice mode, instead of the whole document.
+"""
+
+import logging
+
+import numpy as np
+import pandas as pd
+
+import statement
+
+PAGE_COLUMN = statement.PAGE_COLUMN
+# Amounts are in cents; anything below this is rounding noise
+TOLERANCE = 0.01
+
+GAP_COLUMNS = ['After', 'Before', 'Unexplained Amount', 'First Page', 'Last Page']
+
+logger = logging.getLogger("mpesa.reconcile")
+
+
+def _chronological(frame):
+    """Oldest first; reversing before the stable sort keeps same-second rows in statement order."""
+    chain = frame.iloc[::-1]
+    if 'Transaction Status' in chain.columns:
+        # Failed transactions are listed but never touch the balance
+        chain = chain[~chain['Transaction Status'].astype(str).str.contains('fail', case=False)]
+    return chain.sort_values('Completion Time', kind='stable')
+
+
+def find_gaps(frame):
+    """
+    Finds the places where the balance does not follow from the transactions.
+
+    Args:
+    frame: Normalized transactions with 'Completion Time', 'Paid In',
+        'Withdrawn' (negative) and 'Balance' columns.
+
+    Returns:
+    pd.DataFrame: One row per gap (GAP_COLUMNS): the times of the transactions
+        on either side, the net amount the missing rows must account for, and
+        the pages those two transactions were read from.
+    """
+    if frame.empty or not {'Paid In', 'Withdrawn', 'Balance'}.issubset(frame.columns):
+        return pd.DataFrame(columns=GAP_COLUMNS)
+
+    chain = _chronological(frame)
+    amounts = {col: pd.to_numeric(chain[col], errors='coerce') for col in statement.AMOUNT_COLUMNS}
+    movement = amounts['Paid In'] + amounts['Withdrawn']
+    drift = amounts['Balance'] - movement.cumsum()
+    steps = drift.diff()
+    at_gap = (steps.abs() > TOLERANCE).to_numpy()
+
+    if not at_gap.any():
+        return pd.DataFrame(columns=GAP_COLUMNS)
+
+    positions = at_gap.nonzero()[0]
+    times = chain['Completion Time'].to_numpy()
+    if PAGE_COLUMN in chain.columns:
+        pages = chain[PAGE_COLUMN].to_numpy(dtype=float)
+    else:
+        pages = np.full(len(chain), np.nan)
+
+    # Statements list newest first, so the later transaction sits on the earlier page
+    return pd.DataFrame({
+        'After': times[positions - 1],
+        'Before': times[positions],
+        'Unexplained Amount': steps.to_numpy()[positions].round(2),
+        'First Page': np.minimum(pages[positions - 1], pages[positions]),
+        'Last Page': np.maximum(pages[positions - 1], pages[positions]),
+    })
+
+
+def affected_pages(gaps):
+    """The sorted page numbers spanned by `gaps`."""
+    pages = set()
+    for first, last in gaps[['First Page', 'Last Page']].dropna().itertuples(index=False):
+        pages.update(range(int(first), int(last) + 1))
+    return sorted(pages)
+
+
+def repair(frame, pdf, password, gaps):
+    """
+    Re-extracts only the pages around `gaps` and splices them into `frame`.
+
+    Each affected page is read on its own in lattice mode, which recovers
+    rows that the default stream mode merges or splits. Pages that fail to
+    re-extract keep their original rows. The repaired frame is kept only if
+    it reconciles better than the original.
+
+    Page numbers come from the extraction (see statement.tag_pages); frames
+    without a PAGE_COLUMN are returned unchanged.
+
+    Returns:
+    tuple: (frame, gaps) for whichever version has fewer gaps.
+    """
+    pages = affected_pages(gaps)
+    if not pages or PAGE_COLUMN not in frame.columns:
+        return frame, gaps
+
+    replacements, reread = [], []
+    for page in pages:
+        try:
+            tables = statement.select_transaction_tables(
+                statement.read_statement(pdf, password, pages=[page], lattice=True)
+            )
+        except Exception:
+            # Best effort: a page lattice mode cannot read keeps its original rows
+            logger.warning("Could not re-extract page %s", page, exc_info=True)
+            continue
+        if tables:
+            reread.append(page)
+            replacements.extend(table.assign(**{PAGE_COLUMN: page}) for table in tables)
+    if not replacements:
+        return frame, gaps
+
+    replaced = statement.normalize_transactions(pd.concat(replacements, ignore_index=True))
+    kept = frame[~frame[PAGE_COLUMN].isin(reread)]
+    # Pages are in statement order, so a stable sort on them restores it
+    repaired = (pd.concat([kept, replaced], ignore_index=True)
+                  .sort_values(PAGE_COLUMN, kind='stable')
+                  .reset_index(drop=True))
+
+    repaired_gaps = find_gaps(repaired)
+    if len(repaired_gaps) < len(gaps):
+        return repaired, repaired_gaps
+    return frame, gaps
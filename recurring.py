@@ -0,0 +1,128 @@
+"""
+Detection of recurring payments: rent, loan repayments, subscriptions, salary.
+
+Transactions are collapsed to one event per counterparty per day and sorted by
+counterparty and date once, which is the O(n log n) step. Inter-arrival
+intervals then come from a single vectorized diff, and every per-counterparty
+statistic is a groupby aggregate over that sorted frame, so there is no Python
+loop over counterparties or transactions.
+"""
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+# Cadence name -> (shortest, longest) accepted interval in days
+CADENCES = {
+    "Weekly": (6, 8),
+    "Biweekly": (13, 16),
+    "Monthly": (27, 33),
+}
+MIN_OCCURRENCES = 3
+# Share of a series' intervals that must fall in the cadence window
+MIN_REGULARITY = 0.75
+# Largest coefficient of variation of the amounts of a recurring series
+MAX_AMOUNT_VARIATION = 0.35
+
+RESULT_COLUMNS = ['Counterparty', 'Cadence', 'Occurrences', 'Typical Amount',
+                  'Amount Variation', 'Interval (days)', 'Last Seen', 'Next Expected']
+
+
+def _cadence(intervals):
+    """Names the cadence whose window contains each median interval, or None."""
+    labels = np.full(len(intervals), None, dtype=object)
+    for name, (low, high) in CADENCES.items():
+        labels[(intervals >= low) & (intervals <= high)] = name
+    return labels
+
+
+def detect(frame, value, by='Counterparty', min_occurrences=MIN_OCCURRENCES):
+    """
+    Finds counterparties paid (or paying) at a regular cadence with stable amounts.
+
+    Args:
+    frame: Transactions with 'Completion Time', `by` and `value` columns.
+    value: The amount column, e.g. 'Withdrawn' or 'Paid In'.
+    by: The normalized counterparty column to group by.
+    min_occurrences: Fewest days with a transaction for a series to count.
+
+    Returns:
+    pd.DataFrame: One row per recurring series (RESULT_COLUMNS), largest
+        typical amount first.
+    """
+    if frame.empty:
+        return pd.DataFrame(columns=RESULT_COLUMNS)
+
+    # Several transactions to the same counterparty on one day are one payment
+    events = (frame.assign(_day=frame['Completion Time'].dt.normalize(), _by=frame[by].astype(str))
+                   .groupby(['_by', '_day'], sort=True)[value].sum()
+                   .reset_index())
+    group = events.groupby('_by', sort=False)
+    events['interval'] = group['_day'].diff().dt.days
+
+    stats = group.agg(
+        occurrences=('_day', 'size'),
+        last_seen=('_day', 'max'),
+        amount_mean=(value, 'mean'),
+        amount_median=(value, 'median'),
+        amount_std=(value, 'std'),
+    )
+    stats = stats[stats['occurrences'] >= min_occurrences]
+    if stats.empty:
+        return pd.DataFrame(columns=RESULT_COLUMNS)
+
+    intervals = events.dropna(subset=['interval'])
+    stats['interval'] = intervals.groupby('_by')['interval'].median().reindex(stats.index)
+    stats['cadence'] = _cadence(stats['interval'].to_numpy())
+
+    # Regularity: how many intervals fall inside the series' own cadence window
+    window = pd.DataFrame(
+        [CADENCES.get(c, (np.nan, np.nan)) for c in stats['cadence']],
+        index=stats.index, columns=['low', 'high'],
+    )
+    bounds = window.reindex(intervals['_by']).to_numpy()
+    in_window = (intervals['interval'].to_numpy() >= bounds[:, 0]) & (intervals['interval'].to_numpy() <= bounds[:, 1])
+    stats['regularity'] = pd.Series(in_window, index=intervals.index).groupby(intervals['_by']).mean().reindex(stats.index)
+
+    stats['variation'] = (stats['amount_std'] / stats['amount_mean'].abs()).fillna(0.0)
+    recurring = stats[stats['cadence'].notna()
+                      & (stats['regularity'] >= MIN_REGULARITY)
+                      & (stats['variation'] <= MAX_AMOUNT_VARIATION)]
+
+    result = pd.DataFrame({
+        'Counterparty': recurring.index,
+        'Cadence': recurring['cadence'].to_numpy(),
+        'Occurrences': recurring['occurrences'].to_numpy(),
+        'Typical Amount': recurring['amount_median'].to_numpy(),
+        'Amount Variation': recurring['variation'].to_numpy(),
+        'Interval (days)': recurring['interval'].to_numpy(),
+        'Last Seen': recurring['last_seen'].to_numpy(),
+        'Next Expected': (recurring['last_seen'] + pd.to_timedelta(recurring['interval'], unit='D')).to_numpy(),
+    })
+    return result.sort_values('Typical Amount', ascending=False, kind='stable').reset_index(drop=True)
+
+
+def render_recurring(series, label):
+    """Shows the recurring series found by `detect` with a monthly-equivalent total."""
+    if series.empty:
+        st.info(f"No recurring {label.lower()} found in this statement.")
+        return
+
+    per_month = {"Weekly": 52 / 12, "Biweekly": 26 / 12, "Monthly": 1}
+    monthly_total = (series['Typical Amount'] * series['Cadence'].map(per_month)).sum()
+
+    col1, col2 = st.columns(2)
+    col1.metric(f"Recurring {label}", len(series))
+    col2.metric("Monthly Equivalent", f"Ksh {monthly_total:,.0f}")
+
+    st.dataframe(
+        series,
+        use_container_width=True,
+        hide_index=True,
+        column_config={
+            'Typical Amount': st.column_config.NumberColumn(format="Ksh %.2f"),
+            'Amount Variation': st.column_config.NumberColumn(format="%.2f"),
+            'Last Seen': st.column_config.DateColumn(),
+            'Next Expected': st.column_config.DateColumn(),
+        },
+    )
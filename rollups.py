@@ -0,0 +1,111 @@
+"""
+Monthly and weekly per-counterparty rollups for period-over-period comparison.
+
+Rollups are built once at upload as counterparty x period tables of spend and
+income. Comparing two periods then only picks two columns and subtracts them,
+which is O(counterparties) no matter how many transactions the statement has.
+"""
+
+import pandas as pd
+import streamlit as st
+
+import polars_backend
+
+GRANULARITIES = {"Month": "month", "Week": "week"}
+
+
+def period_keys(times, granularity):
+    """Labels each timestamp with its period: 'YYYY-MM' for months, the Monday's date for weeks."""
+    if polars_backend.enabled():
+        return polars_backend.period_keys(times, granularity)
+    if granularity == "month":
+        return times.dt.strftime("%Y-%m")
+    week_start = (times - pd.to_timedelta(times.dt.weekday, unit="D")).dt.normalize()
+    return week_start.dt.strftime("%Y-%m-%d")
+
+
+def _pivot(frame, value, granularity):
+    periods = period_keys(frame['Completion Time'], granularity)
+    if polars_backend.enabled():
+        sums = polars_backend.group_sums(frame.assign(_period=periods), ['Counterparty', '_period'], value)['sum']
+    else:
+        sums = frame.groupby([frame['Counterparty'], periods], observed=True)[value].sum()
+    table = sums.unstack(fill_value=0.0).rename_axis(columns='Period')
+    table.index = pd.Index(table.index.astype(str), name='Counterparty')
+    return table.sort_index(axis=1)
+
+
+def build_rollups(withdrawals=None, received=None):
+    """
+    Builds the rollups for both granularities.
+
+    Returns:
+    dict: {granularity: {'spend': table, 'income': table}}, where each table
+        has one row per counterparty and one column per period.
+    """
+    rollups = {}
+    for granularity in GRANULARITIES.values():
+        rollups[granularity] = {}
+        if withdrawals is not None and not withdrawals.empty:
+            rollups[granularity]['spend'] = _pivot(withdrawals, 'Withdrawn', granularity)
+        if received is not None and not received.empty:
+            rollups[granularity]['income'] = _pivot(received, 'Paid In', granularity)
+    return rollups
+
+
+def compare(table, base_period, compare_period, exclude=()):
+    """
+    Per-counterparty change between two periods of a rollup table.
+
+    Returns:
+    pd.DataFrame: Counterparty, both periods' totals, the change and the
+        percentage change, largest absolute change first. Counterparties with
+        nothing in either period are left out.
+    """
+    base = table[base_period] if base_period in table.columns else pd.Series(0.0, index=table.index)
+    current = table[compare_period] if compare_period in table.columns else pd.Series(0.0, index=table.index)
+
+    result = pd.DataFrame({base_period: base, compare_period: current})
+    result['Change'] = current - base
+    result['Change %'] = (result['Change'] / base.where(base != 0)) * 100
+    result = result[(base != 0) | (current != 0)]
+    if len(exclude):
+        result = result.drop(index=list(exclude), errors='ignore')
+
+    order = result['Change'].abs().sort_values(ascending=False, kind='stable').index
+    return result.loc[order].reset_index()
+
+
+def render_comparison(rollups, measure, label, key, exclude=()):
+    """Shows period pickers, totals and the biggest per-counterparty movers for `measure`."""
+    granularity_label = st.radio("Compare by:", list(GRANULARITIES), horizontal=True, key=f"{key}_granularity")
+    table = rollups.get(GRANULARITIES[granularity_label], {}).get(measure)
+    if table is None or table.shape[1] < 2:
+        st.info(f"At least two {granularity_label.lower()}s of data are needed for a comparison.")
+        return
+
+    periods = table.columns.tolist()
+    col1, col2 = st.columns(2)
+    with col1:
+        base_period = st.selectbox("Base period:", periods, index=len(periods) - 2, key=f"{key}_base_period")
+    with col2:
+        compare_period = st.selectbox("Compare with:", periods, index=len(periods) - 1, key=f"{key}_compare_period")
+
+    comparison = compare(table, base_period, compare_period, exclude)
+    base_total = comparison[base_period].sum()
+    compare_total = comparison[compare_period].sum()
+
+    col1, col2, col3 = st.columns(3)
+    col1.metric(f"{label} in {base_period}", f"Ksh {base_total:,.0f}")
+    col2.metric(f"{label} in {compare_period}", f"Ksh {compare_total:,.0f}")
+    col3.metric("Change", f"Ksh {compare_total - base_total:,.0f}",
+                delta=f"{(compare_total - base_total) / base_total * 100:+.1f}%" if base_total else None,
+                # More spending is bad news, more income good news
+                delta_color="inverse" if measure == 'spend' else "normal")
+
+    if comparison.empty:
+        st.info("No transactions in either period.")
+        return
+
+    st.bar_chart(comparison.head(15), x='Counterparty', y='Change', use_container_width=True)
+    st.dataframe(comparison, use_container_width=True, hide_index=True)
@@ -0,0 +1,345 @@
+"""
+Extraction and normalization of M-Pesa PDF statements.
+
+Tables are recognized by their header signature rather than by position, so
+summary tables, disclaimers and layout variations are skipped before anything
+is concatenated, and only the transaction columns are kept. The normalized
+result is then split into the frames the analysis pages read.
+"""
+
+import re
+
+import pandas as pd
+
+import aggregates
+import polars_backend
+import recurring
+import rollups
+import widget_meta
+
+PAGE_COLUMN = 'Page'
+# Pages extracted per tabula call in chunked mode
+PAGES_PER_BATCH = 10
+
+TRANSACTION_COLUMNS = ['Receipt No.', 'Completion Time', 'Details', 'Transaction Status', 'Paid In', 'Withdrawn', 'Balance']
+REQUIRED_COLUMNS = {'Completion Time', 'Details', 'Paid In', 'Withdrawn', 'Balance'}
+AMOUNT_COLUMNS = ['Paid In', 'Withdrawn', 'Balance']
+TEXT_COLUMNS = ['Receipt No.', 'Details', 'Transaction Status']
+# How M-Pesa prints 'Completion Time', e.g. "2024-01-31 18:05:12"
+COMPLETION_TIME_PATTERN = re.compile(r'^\d{4}-\d{2}-\d{2} \d{1,2}:\d{2}(:\d{2})?$')
+# Derived from 'Completion Time' once per upload for the per-day and weekday views
+CALENDAR_COLUMNS = ['date', 'weekday', 'year_month']
+
+# Keep every cell as text: we convert dates and amounts ourselves, so pandas
+# type inference on each raw table would be wasted work.
+READ_OPTIONS = {'multiple_tables': True, 'pandas_options': {'dtype': str}}
+
+
+def custom_to_float(value):
+    """
+    Converts a given value to a float.
+
+    Args:
+    value: The value to be converted to a float.
+
+    Returns:
+    float: The converted float value if successful, otherwise returns the original value.
+    """
+    if isinstance(value, str):
+        try:
+            return float(value.replace(',', ''))
+        except ValueError:
+            return value
+    return value
+
+
+def normalize_header(column):
+    """Collapses the line breaks and repeated spaces tabula leaves in header cells."""
+    return re.sub(r'\s+', ' ', str(column)).strip()
+
+
+def _continuation_start(table):
+    """
+    Position of the 'Receipt No.' column of a headerless continuation table, or None.
+
+    Without a header row on the page, tabula takes the first transaction as
+    the column names; its blank cells (every row leaves Paid In or Withdrawn
+    empty) come back as 'Unnamed: N'. The table is anchored on the cell
+    holding the completion time, and the columns around it are taken by
+    position.
+    """
+    cells = [normalize_header(c) for c in table.columns]
+    time_column = TRANSACTION_COLUMNS.index('Completion Time')
+    for position, cell in enumerate(cells):
+        if COMPLETION_TIME_PATTERN.match(cell):
+            start = position - time_column
+            if start >= 0 and start + len(TRANSACTION_COLUMNS) <= len(cells):
+                return start
+            return None
+    return None
+
+
+def transaction_table(table, previous_was_transactions=False):
+    """
+    Recognizes a transaction table by its header and trims it to the transaction columns.
+
+    Args:
+    table: A raw table returned by tabula.
+    previous_was_transactions: Whether the preceding table was a transaction
+        table, in which case a headerless table with the same shape is
+        treated as its continuation.
+
+    Returns:
+    pd.DataFrame or None: The table restricted to TRANSACTION_COLUMNS, or None if it is not a transaction table.
+    """
+    renamed = table.rename(columns=normalize_header)
+    if REQUIRED_COLUMNS.issubset(renamed.columns):
+        return renamed[[c for c in TRANSACTION_COLUMNS if c in renamed.columns]]
+
+    start = _continuation_start(table) if previous_was_transactions else None
+    if start is not None:
+        body = table.iloc[:, start:start + len(TRANSACTION_COLUMNS)]
+        first_row = [None if str(c).startswith('Unnamed') else normalize_header(c) for c in body.columns]
+        header_row = pd.DataFrame([first_row], columns=TRANSACTION_COLUMNS, dtype=str)
+        return pd.concat([header_row, body.set_axis(TRANSACTION_COLUMNS, axis=1)], ignore_index=True)
+
+    return None
+
+
+def _select(tables, previous_was_transactions=False):
+    selected = []
+    for table in tables:
+        trimmed = transaction_table(table, previous_was_transactions)
+        previous_was_transactions = trimmed is not None
+        if trimmed is not None and not trimmed.empty:
+            selected.append(trimmed)
+    return selected, previous_was_transactions
+
+
+def select_transaction_tables(tables):
+    """Returns the transaction tables among `tables`, in order, trimmed to the transaction columns."""
+    return _select(tables)[0]
+
+
+def tag_pages(tables, first_page=1):
+    """
+    Labels each transaction table with its page number, by position.
+
+    tabula does not say which page a table came from when it reads several
+    pages in one call. This assumes one transaction table per page
+    (continuation tables included), starting on `first_page`, so the n-th
+    table comes from page `first_page + n`. A page with no or two
+    transaction tables shifts every later tag; callers only use this when the
+    number of tables matches the number of pages read.
+    """
+    return [table.assign(**{PAGE_COLUMN: first_page + i}) for i, table in enumerate(tables)]
+
+
+def read_statement(pdf, password, pages='all', **options):
+    """
+    Extracts the raw tables from an encrypted statement PDF.
+
+    Args:
+    pdf: Path or file-like object of the statement.
+    password: The statement password.
+    pages: 'all', a page number or a list of page numbers.
+    **options: Extra tabula options, e.g. `lattice=True`.
+    """
+    import tabula
+
+    # Uploaded files are read again when pages are re-extracted
+    if hasattr(pdf, 'seek'):
+        pdf.seek(0)
+    return tabula.read_pdf(pdf, pages=pages, password=password, **READ_OPTIONS, **options)
+
+
+def count_pages(pdf, password):
+    """
+    Number of pages of the statement, read from the PDF's page tree.
+
+    Returns:
+    int or None: None when pypdf is not installed or cannot open the file.
+    """
+    try:
+        from pypdf import PdfReader
+    except ImportError:
+        return None
+
+    try:
+        if hasattr(pdf, 'seek'):
+            pdf.seek(0)
+        reader = PdfReader(pdf)
+        if reader.is_encrypted:
+            reader.decrypt(password)
+        return len(reader.pages)
+    except Exception:
+        return None
+
+
+def _read_pages(pdf, password, pages, probing):
+    """
+    Raw tables of `pages` read one page at a time, as (page, tables) pairs.
+
+    When probing past an unknown end, the first page that fails ends the
+    document; only a failure on page 1 means it cannot be read at all.
+
+    Returns:
+    tuple: (pairs, whether the document may continue past `pages`).
+    """
+    read = []
+    for page in pages:
+        try:
+            read.append((page, read_statement(pdf, password, pages=[page])))
+        except Exception:
+            if not probing or page == 1:
+                raise
+            return read, False
+    return read, True
+
+
+def _read_batch(pdf, password, first, last, probing):
+    """
+    Raw tables of pages `first`..`last` as (page, tables) pairs, and whether the document may continue past them.
+
+    The batch is read in one call, which returns a single pair with page
+    None since tabula does not report pages. When the page count is unknown,
+    a batch that runs past the last page makes tabula fail; it is then read
+    page by page up to the end.
+    """
+    pages = list(range(first, last + 1))
+    try:
+        return [(None, read_statement(pdf, password, pages=pages))], True
+    except Exception:
+        if not probing:
+            raise
+    return _read_pages(pdf, password, pages, probing)
+
+
+def read_in_batches(pdf, password, page_count=None, batch_size=PAGES_PER_BATCH):
+    """
+    Extracts and normalizes the statement `batch_size` pages at a time.
+
+    Only one batch of raw tabula tables is alive at a time: each batch is
+    trimmed to its transaction tables, tagged with page numbers and
+    normalized before the next one is read, so peak memory does not grow
+    with the length of the statement. Without `page_count`, batches are
+    read until the document ends.
+
+    Pages are tagged by position (see tag_pages) when a batch holds one
+    transaction table per page; otherwise the batch is read again page by
+    page, so each table carries the page it was really read from.
+
+    Yields:
+    tuple: (last page read, normalized transactions of the batch or None).
+    """
+    first, previous_was_transactions = 1, False
+    while page_count is None or first <= page_count:
+        last = first + batch_size - 1 if page_count is None else min(first + batch_size - 1, page_count)
+        probing = page_count is None
+        pages, more = _read_batch(pdf, password, first, last, probing)
+        if not any(tables for _, tables in pages) and probing:
+            break
+
+        selected = None
+        if pages[0][0] is None:
+            # A headerless table at the top of the batch may continue the previous batch's last table
+            batch_selected, state = _select(pages[0][1], previous_was_transactions)
+            if len(batch_selected) == last - first + 1:
+                selected, previous_was_transactions = tag_pages(batch_selected, first_page=first), state
+            else:
+                del batch_selected
+                pages, more = _read_pages(pdf, password, range(first, last + 1), probing)
+        if selected is None:
+            selected = []
+            for page, tables in pages:
+                on_page, previous_was_transactions = _select(tables, previous_was_transactions)
+                selected.extend(table.assign(**{PAGE_COLUMN: page}) for table in on_page)
+        del pages
+
+        batch = None
+        if selected:
+            batch = normalize_transactions(pd.concat(selected, ignore_index=True))
+        del selected
+        yield last, batch
+        if not more:
+            break
+        first = last + 1
+
+
+def normalize_transactions(frame):
+    """
+    Parses dates and amounts of concatenated transaction tables.
+
+    Rows without a valid 'Completion Time' (repeated headers, footers) are
+    dropped. Empty amount cells become 0 and empty text cells ''.
+    """
+    if polars_backend.enabled():
+        return polars_backend.normalize_transactions(frame, AMOUNT_COLUMNS, TEXT_COLUMNS)
+
+    frame = frame.copy()
+    frame['Completion Time'] = pd.to_datetime(frame['Completion Time'], errors='coerce')
+    frame = frame.dropna(subset=['Completion Time'])
+    frame['Month'] = frame['Completion Time'].dt.month
+
+    for col in AMOUNT_COLUMNS:
+        if col in frame.columns:
+            frame[col] = frame[col].fillna(0).apply(custom_to_float)
+    # Text columns stay text, so exports and counterparty parsing never see a stray 0
+    text = [col for col in TEXT_COLUMNS if col in frame.columns]
+    frame[text] = frame[text].fillna('')
+    return frame
+
+
+def add_calendar_columns(frame):
+    """
+    Adds the CALENDAR_COLUMNS (calendar day, weekday name and 'YYYY-MM') of 'Completion Time'.
+
+    Returns:
+    pd.DataFrame: A copy of `frame` with the extra columns.
+    """
+    frame = frame.copy()
+    frame['date'] = frame['Completion Time'].dt.date
+    if polars_backend.enabled():
+        frame[['weekday', 'year_month']] = polars_backend.calendar_columns(frame['Completion Time'])
+    else:
+        frame['weekday'] = frame['Completion Time'].dt.day_name()
+        frame['year_month'] = frame['Completion Time'].dt.to_period('M').astype(str)
+    return frame
+
+
+def session_frames(frame):
+    """
+    Splits a normalized statement into the entries the analysis pages read from session state.
+
+    Withdrawals are made positive, and both sides get a 'Day of Month' column
+    and the CALENDAR_COLUMNS.
+    Aggregates that the pages maintain incrementally, and the metadata their
+    widgets are built from, are precomputed here, once per upload. Sides without transactions are left out.
+
+    Returns:
+    dict: Session state entries keyed by name.
+    """
+    entries = {}
+
+    if 'Withdrawn' in frame.columns:
+        withdrawals = frame[frame['Withdrawn'] != 0].copy()
+        if not withdrawals.empty:
+            withdrawals.loc[:, 'Withdrawn'] = withdrawals.loc[:, 'Withdrawn'] * -1
+            withdrawals.loc[:, 'Day of Month'] = withdrawals['Completion Time'].dt.day
+            withdrawals = add_calendar_columns(withdrawals)
+            entries['Withdrawals'] = withdrawals
+            entries['expense_aggregates'] = aggregates.contributions(withdrawals, 'Withdrawn')
+            entries['recurring_expenses'] = recurring.detect(withdrawals, 'Withdrawn')
+            entries['expense_widget_meta'] = widget_meta.describe(withdrawals, 'Withdrawn')
+
+    if 'Paid In' in frame.columns:
+        received = frame[frame['Paid In'] != 0].copy()
+        if not received.empty:
+            received.loc[:, 'Day of Month'] = received['Completion Time'].dt.day
+            received = add_calendar_columns(received)
+            entries['received'] = received
+            entries['recurring_income'] = recurring.detect(received, 'Paid In')
+            entries['income_widget_meta'] = widget_meta.describe(received, 'Paid In')
+
+    entries['period_rollups'] = rollups.build_rollups(entries.get('Withdrawals'), entries.get('received'))
+    return entries
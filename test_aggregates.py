@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""
+Tests that subtractive aggregates match a full recomputation
+"""
+
+import numpy as np
+import pytest
+
+import aggregates
+import loadtest
+
+
+@pytest.fixture(scope="module")
+def withdrawals():
+    return loadtest.session_frames(loadtest.synthetic_statement(2000, seed=3))['Withdrawals']
+
+
+@pytest.mark.parametrize("removed", [[], ["NCBA BANK"], ["NCBA BANK", "JOHN DOE", "NOT A COUNTERPARTY"]])
+def test_excluding_matches_recompute(withdrawals, removed):
+    result = aggregates.excluding(aggregates.contributions(withdrawals, 'Withdrawn'), removed)
+    kept = withdrawals[~withdrawals['Counterparty'].isin(removed)]
+
+    assert result['count'] == len(kept)
+    assert result['total'] == pytest.approx(kept['Withdrawn'].sum())
+    assert result['mean'] == pytest.approx(kept['Withdrawn'].mean())
+
+    daily = kept.groupby('Day of Month')['Withdrawn'].sum()
+    assert result['daily']['Day of Month'].tolist() == daily.index.tolist()
+    np.testing.assert_allclose(result['daily']['Withdrawn'], daily.to_numpy())
+
+    top = kept.groupby('Counterparty', observed=True)['Withdrawn'].sum().sort_values(ascending=False).head(15)
+    assert result['top']['Counterparty'].tolist() == top.index.astype(str).tolist()
+    np.testing.assert_allclose(result['top']['Withdrawn'], top.to_numpy())
+
+
+def test_removing_everything_leaves_empty_aggregates(withdrawals):
+    contrib = aggregates.contributions(withdrawals, 'Withdrawn')
+    result = aggregates.excluding(contrib, contrib['groups'])
+    assert result['count'] == 0
+    assert result['total'] == 0.0
+    assert result['daily'].empty and result['top'].empty
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Tests for credential verification and login rate limiting
+"""
+
+import pytest
+
+import auth
+
+
+@pytest.fixture(autouse=True)
+def credentials(monkeypatch):
+    monkeypatch.setattr(auth, '_credentials', lambda: {"alice": auth._digest("s3cret")})
+    monkeypatch.setattr(auth, '_limiter', auth.AttemptLimiter())
+    monkeypatch.setattr(auth, '_address_limiter', auth.AttemptLimiter(auth.MAX_FREE_ATTEMPTS_PER_ADDRESS))
+
+
+def test_verify_accepts_only_the_right_password():
+    assert auth.verify("alice", "s3cret", now=0.0) == (True, 0.0)
+    assert auth.verify("alice", "wrong", now=1.0) == (False, 0.0)
+    assert auth.verify("mallory", "s3cret", now=2.0) == (False, 0.0)
+
+
+def test_backoff_doubles_after_free_attempts():
+    for attempt in range(auth.MAX_FREE_ATTEMPTS):
+        assert auth.verify("alice", "wrong", now=float(attempt)) == (False, 0.0)
+
+    last = auth.MAX_FREE_ATTEMPTS - 1
+    ok, wait = auth.verify("alice", "s3cret", now=last + 0.5)
+    assert not ok and wait == pytest.approx(auth.BASE_DELAY_S - 0.5)
+
+    # Once the wait is over one more failure doubles it
+    after = last + auth.BASE_DELAY_S
+    assert auth.verify("alice", "wrong", now=after) == (False, 0.0)
+    assert auth.verify("alice", "s3cret", now=after)[1] == pytest.approx(2 * auth.BASE_DELAY_S)
+    assert auth.verify("alice", "s3cret", now=after + 2 * auth.BASE_DELAY_S) == (True, 0.0)
+
+
+def test_shared_address_tolerates_other_users_failures():
+    # Behind a proxy every user may share one address
+    for attempt, user in enumerate(["bob", "carol", "dave"]):
+        auth.verify(user, "guess", "10.0.0.1", now=float(attempt))
+    assert auth.verify("alice", "s3cret", "10.0.0.1", now=3.0) == (True, 0.0)
+
+
+def test_failures_are_counted_per_address_across_usernames():
+    for attempt in range(auth.MAX_FREE_ATTEMPTS_PER_ADDRESS):
+        auth.verify(f"user{attempt}", "guess", "10.0.0.1", now=float(attempt))
+    now = float(auth.MAX_FREE_ATTEMPTS_PER_ADDRESS)
+    assert auth.verify("alice", "s3cret", "10.0.0.1", now=now)[1] > 0
+    assert auth.verify("alice", "s3cret", "10.0.0.2", now=now) == (True, 0.0)
+
+
+def test_successful_login_clears_the_address_counter():
+    for attempt in range(auth.MAX_FREE_ATTEMPTS_PER_ADDRESS - 1):
+        auth.verify(f"user{attempt}", "guess", "10.0.0.1", now=float(attempt))
+    assert auth.verify("alice", "s3cret", "10.0.0.1", now=100.0) == (True, 0.0)
+    # Without the reset this failure would use up the address's last free attempt
+    auth.verify("bob", "guess", "10.0.0.1", now=101.0)
+    assert auth.verify("alice", "s3cret", "10.0.0.1", now=102.0) == (True, 0.0)
+
+
+def test_delay_is_capped():
+    assert auth.AttemptLimiter().delay(1000) == auth.MAX_DELAY_S
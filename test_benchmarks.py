@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Benchmarks of ingestion and page computation against stored baselines
+"""
+
+import pandas as pd
+import pytest
+
+import aggregates
+import counterparty
+import loadtest
+import query_engine
+import reconcile
+import statement
+
+pytestmark = pytest.mark.benchmark
+
+
+def _ingest(tables):
+    selected = statement.tag_pages(statement.select_transaction_tables(tables))
+    return statement.normalize_transactions(pd.concat(selected, ignore_index=True))
+
+
+def _parse_cold(frame):
+    counterparty.clear_memo()
+    return counterparty.add_counterparty_columns(frame)
+
+
+def test_ingest(benchmark, synthetic, statement_rows):
+    tables = loadtest.raw_tables(synthetic(statement_rows))
+    result = benchmark(_ingest, tables)
+    assert len(result) == statement_rows
+
+
+def test_parse_counterparties(benchmark, synthetic, statement_rows):
+    result = benchmark(_parse_cold, synthetic(statement_rows))
+    assert result['Counterparty'].notna().all()
+
+
+def test_session_frames(benchmark, synthetic, statement_rows):
+    parsed = counterparty.add_counterparty_columns(synthetic(statement_rows))
+    entries = benchmark(statement.session_frames, parsed)
+    assert len(entries['Withdrawals']) + len(entries['received']) == statement_rows
+
+
+def test_reconcile(benchmark, synthetic, statement_rows):
+    assert benchmark(reconcile.find_gaps, synthetic(statement_rows)).empty
+
+
+def test_page_queries(benchmark, synthetic, statement_rows):
+    withdrawals = statement.session_frames(counterparty.add_counterparty_columns(synthetic(statement_rows)))['Withdrawals']
+    exclusion = {'exclude': {'Counterparty': ["NCBA BANK"]}}
+
+    def page_queries():
+        kept = query_engine.filter_frame(withdrawals, **exclusion)
+        return kept, query_engine.group_totals(withdrawals, 'Counterparty', 'Withdrawn', **exclusion), \
+            query_engine.daily_totals(withdrawals, 'Withdrawn', **exclusion)
+
+    kept, totals, daily = benchmark(page_queries)
+    assert totals['Withdrawn'].sum() == pytest.approx(kept['Withdrawn'].sum())
+    assert daily['Withdrawn'].sum() == pytest.approx(kept['Withdrawn'].sum())
+
+
+def test_exclusion_aggregates(benchmark, synthetic, statement_rows):
+    entries = statement.session_frames(counterparty.add_counterparty_columns(synthetic(statement_rows)))
+    contrib = entries['expense_aggregates']
+    result = benchmark(aggregates.excluding, contrib, contrib['groups'][:5], repeat=20)
+    assert result['count'] < len(entries['Withdrawals'])
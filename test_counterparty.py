@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Tests for splitting the Details column into type, counterparty and account
+"""
+
+import pandas as pd
+
+import counterparty
+
+
+def test_parses_common_statement_formats():
+    details = pd.Series([
+        "Customer Transfer to 0712******678 - JOHN DOE",
+        "Merchant Payment Online to 5003321 - JAVA HOUSE",
+        "Pay Bill Online to 888880 - KPLC PREPAID Acc. 37194829",
+        "Customer Withdrawal\rAt Agent Till 654321 - MALI AGENCIES",
+        "Business Payment from 303030 - ACME LTD via API",
+        "Airtime Purchase",
+    ])
+    parsed = counterparty.parse_details(details)
+
+    assert parsed['Transaction Type'].tolist() == [
+        "Customer Transfer", "Merchant Payment Online", "Pay Bill Online",
+        "Customer Withdrawal", "Business Payment", "Airtime Purchase",
+    ]
+    assert parsed['Counterparty'].tolist() == [
+        "JOHN DOE", "JAVA HOUSE", "KPLC PREPAID", "MALI AGENCIES", "ACME LTD", "AIRTIME PURCHASE",
+    ]
+    assert parsed['Account'].tolist() == ["0712******678", "5003321", "888880", "654321", "303030", ""]
+
+
+def test_same_counterparty_across_transaction_types_shares_one_group():
+    details = pd.Series([
+        "Customer Transfer to 0712******678 - JOHN DOE",
+        "Customer Transfer to 0712******678 - John  Doe",
+        "Funds received from 0712******678 - JOHN DOE",
+    ])
+    parsed = counterparty.parse_details(details)
+    assert parsed['Counterparty'].nunique() == 1
+    assert parsed['Counterparty'].dtype == "category"
+
+
+def test_unmasked_phone_numbers_are_masked():
+    assert counterparty.mask_account("0712345678") == "0712***678"
+    assert counterparty.mask_account("254712345678") == "254712***678"
+    assert counterparty.mask_account("888880") == "888880"
+
+
+def test_add_counterparty_columns_preserves_index():
+    frame = pd.DataFrame(
+        {"Details": ["Merchant Payment to 123456 - NAIVAS", "Airtime Purchase"], "Withdrawn": [100.0, 50.0]},
+        index=[10, 20],
+    )
+    result = counterparty.add_counterparty_columns(frame)
+    assert list(result.index) == [10, 20]
+    assert result.loc[10, 'Counterparty'] == "NAIVAS"
+
+
+def test_full_memo_is_cleared_without_losing_cached_strings(monkeypatch):
+    monkeypatch.setattr(counterparty, 'MEMO_LIMIT', 3)
+    counterparty.clear_memo()
+    counterparty.parse_details(pd.Series(["Airtime Purchase", "Customer Transfer to 0712******678 - JOHN DOE"]))
+
+    # One cached string and two new ones overflow the memo
+    details = pd.Series([
+        "Airtime Purchase",
+        "Pay Bill Online to 888880 - KPLC PREPAID Acc. 37194829",
+        "Merchant Payment to 123456 - SHOP",
+    ])
+    parsed = counterparty.parse_details(details)
+    counterparty.clear_memo()
+
+    assert parsed['Counterparty'].tolist() == ["AIRTIME PURCHASE", "KPLC PREPAID", "SHOP"]
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Tests that chunked exports round-trip the data
+"""
+
+import io
+
+import pandas as pd
+import pytest
+
+import export
+import loadtest
+import statement
+
+
+@pytest.fixture(scope="module")
+def withdrawals():
+    return loadtest.session_frames(loadtest.synthetic_statement(1200, seed=8))['Withdrawals']
+
+
+@pytest.fixture
+def small_chunks(monkeypatch):
+    # Several chunks even for a small frame
+    monkeypatch.setattr(export, 'CHUNK_ROWS', 250)
+
+
+def test_csv_round_trip(withdrawals, small_chunks):
+    with export.serialize({"Transactions": lambda: withdrawals}, "CSV", "Transactions") as out:
+        result = pd.read_csv(out, parse_dates=['Completion Time'])
+    assert len(result) == len(withdrawals)
+    assert result['Withdrawn'].sum() == pytest.approx(withdrawals['Withdrawn'].sum())
+    assert (result['Completion Time'] == withdrawals['Completion Time'].reset_index(drop=True)).all()
+
+
+def test_parquet_round_trip(withdrawals, small_chunks):
+    with export.serialize({"Transactions": lambda: withdrawals}, "Parquet", "Transactions") as out:
+        result = pd.read_parquet(io.BytesIO(out.read()))
+    pd.testing.assert_frame_equal(result, withdrawals.reset_index(drop=True), check_dtype=False, check_categorical=False)
+
+
+def test_excel_has_one_sheet_per_dataset(withdrawals, small_chunks):
+    openpyxl = pytest.importorskip("openpyxl")
+    datasets = {
+        "Transactions": lambda: withdrawals[['Completion Time', 'Counterparty', 'Withdrawn']],
+        "Empty": lambda: withdrawals.iloc[:0][['Withdrawn']],
+    }
+    with export.serialize(datasets, "Excel") as out:
+        workbook = openpyxl.load_workbook(io.BytesIO(out.read()), read_only=True)
+    assert workbook.sheetnames == ["Transactions", "Empty"]
+    rows = list(workbook["Transactions"].values)
+    assert rows[0] == ('Completion Time', 'Counterparty', 'Withdrawn')
+    assert len(rows) == len(withdrawals) + 1
+    assert list(workbook["Empty"].values) == [('Withdrawn',)]
+
+
+def test_parquet_round_trip_with_empty_text_cell(small_chunks):
+    raw = loadtest.synthetic_statement(300, seed=2)[statement.TRANSACTION_COLUMNS].astype(str)
+    raw.loc[raw.index[5], 'Receipt No.'] = None
+    transactions = statement.normalize_transactions(raw)
+
+    with export.serialize({"Transactions": lambda: transactions}, "Parquet", "Transactions") as out:
+        result = pd.read_parquet(io.BytesIO(out.read()))
+    assert result['Receipt No.'].iloc[5] == ''
+    pd.testing.assert_frame_equal(result, transactions.reset_index(drop=True), check_dtype=False)
@@ -0,0 +1,24 @@
+#!/usr/bin/env python3
+"""
+Startup benchmark: every page must stay within its import-time budget
+"""
+
+import pytest
+
+import import_budget
+
+
+@pytest.mark.parametrize("page", sorted(import_budget.IMPORT_BUDGET_MS))
+def test_heavy_modules_are_deferred(page):
+    top_level = {module.split(".")[0] for module in import_budget.page_imports(page)}
+    assert not top_level & import_budget.DEFERRED_MODULES
+
+
+@pytest.mark.benchmark
+def test_pages_within_import_budget():
+    over_budget = [
+        f"{result['page']}: {result['ms']} ms > {result['budget_ms']} ms"
+        for result in import_budget.check_budgets()
+        if not result["ok"]
+    ]
+    assert not over_budget, over_budget
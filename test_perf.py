@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+"""
+Tests for the per-stage timing instrumentation
+"""
+
+import perf
+
+
+def test_percentile_nearest_rank():
+    values = list(range(1, 101))
+    assert perf.percentile(values, 50) == 50
+    assert perf.percentile(values, 99) == 99
+    assert perf.percentile([7.0], 90) == 7.0
+
+
+def test_stage_records_history():
+    perf.reset_history()
+    for _ in range(3):
+        with perf.stage("unit"):
+            sum(range(1000))
+
+    summary = perf.history_summary()
+    assert len(summary) == 1
+    assert summary[0]["stage"] == "unit"
+    assert summary[0]["calls"] == 3
+    assert summary[0]["p50 ms"] <= summary[0]["p99 ms"]
+
+
+def test_stage_records_even_when_block_raises():
+    perf.reset_history()
+    try:
+        with perf.stage("failing"):
+            raise ValueError("boom")
+    except ValueError:
+        pass
+    assert perf.history_summary()[0]["calls"] == 1
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Parity tests: the Polars backend must give the same results as pandas
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import aggregates
+import counterparty
+import loadtest
+import polars_backend
+import rollups
+import statement
+
+pytest.importorskip("polars")
+
+
+@pytest.fixture
+def use_polars(monkeypatch):
+    monkeypatch.setenv(polars_backend.BACKEND_ENV, "polars")
+
+
+@pytest.fixture(scope="module")
+def raw_statement():
+    """Text cells, as tabula returns them, plus a repeated header and missing amount and text cells."""
+    transactions = loadtest.synthetic_statement(2000, seed=11)
+    raw = transactions[statement.TRANSACTION_COLUMNS].astype(object)
+    raw['Completion Time'] = transactions['Completion Time'].dt.strftime('%Y-%m-%d %H:%M:%S')
+    for col in statement.AMOUNT_COLUMNS:
+        raw[col] = transactions[col].map('{:,.2f}'.format)
+    raw.loc[5] = statement.TRANSACTION_COLUMNS
+    raw.loc[7, 'Paid In'] = None
+    raw.loc[9, 'Details'] = None
+    raw.loc[11, 'Receipt No.'] = None
+    return raw
+
+
+def test_backend_is_opt_in(monkeypatch):
+    monkeypatch.delenv(polars_backend.BACKEND_ENV, raising=False)
+    assert not polars_backend.enabled()
+    monkeypatch.setenv(polars_backend.BACKEND_ENV, "Polars")
+    assert polars_backend.enabled()
+
+
+def test_normalize_parity(raw_statement, monkeypatch):
+    expected = statement.normalize_transactions(raw_statement)
+    monkeypatch.setenv(polars_backend.BACKEND_ENV, "polars")
+    result = statement.normalize_transactions(raw_statement)
+
+    assert list(result.index) == list(expected.index)
+    for col in ['Completion Time', 'Month', *statement.AMOUNT_COLUMNS]:
+        np.testing.assert_array_equal(result[col].to_numpy(), expected[col].to_numpy().astype(result[col].dtype))
+    for col in statement.TEXT_COLUMNS:
+        assert result[col].tolist() == expected[col].tolist()
+    assert result.loc[11, 'Receipt No.'] == ''
+    pd.testing.assert_series_equal(
+        counterparty.add_counterparty_columns(result)['Counterparty'].astype(str),
+        counterparty.add_counterparty_columns(expected)['Counterparty'].astype(str),
+    )
+
+
+def test_calendar_columns_parity(use_polars):
+    times = loadtest.synthetic_statement(500, seed=12)['Completion Time']
+    result = polars_backend.calendar_columns(times)
+    assert result['weekday'].tolist() == times.dt.day_name().tolist()
+    assert result['year_month'].tolist() == times.dt.to_period('M').astype(str).tolist()
+
+
+def test_aggregation_parity(monkeypatch):
+    withdrawals = loadtest.session_frames(loadtest.synthetic_statement(3000, seed=13))['Withdrawals']
+    expected_contrib = aggregates.contributions(withdrawals, 'Withdrawn')
+    expected_rollups = rollups.build_rollups(withdrawals)
+
+    monkeypatch.setenv(polars_backend.BACKEND_ENV, "polars")
+    contrib = aggregates.contributions(withdrawals, 'Withdrawn')
+    assert sorted(contrib['groups']) == sorted(expected_contrib['groups'].astype(str))
+    for removed in ([], ["NCBA BANK"]):
+        result, expected = aggregates.excluding(contrib, removed), aggregates.excluding(expected_contrib, removed)
+        assert result['count'] == expected['count']
+        assert result['total'] == pytest.approx(expected['total'])
+        pd.testing.assert_frame_equal(result['daily'], expected['daily'], check_dtype=False)
+
+    for granularity, tables in rollups.build_rollups(withdrawals).items():
+        expected = expected_rollups[granularity]['spend']
+        pd.testing.assert_frame_equal(tables['spend'], expected, check_dtype=False)
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Tests for the DuckDB filter and aggregation layer
+"""
+
+from datetime import date
+
+import pandas as pd
+import pytest
+
+import query_engine
+
+
+@pytest.fixture
+def withdrawals():
+    return pd.DataFrame({
+        'Completion Time': pd.to_datetime(['2024-01-01 09:00:00', '2024-01-01 18:00:00', '2024-01-02 12:00:00', '2024-01-03 08:00:00']),
+        'Details': ['Merchant Payment to 1 - NAIVAS', 'Pay Bill to 2 - KPLC 50%', 'Merchant Payment to 1 - NAIVAS', 'Airtime Purchase'],
+        'Counterparty': pd.Categorical(['NAIVAS', 'KPLC', 'NAIVAS', 'AIRTIME PURCHASE']),
+        'Withdrawn': [100.0, 300.0, 50.0, 20.0],
+        'Day of Month': [1, 1, 2, 3],
+    }, index=[10, 11, 12, 13])
+
+
+def test_group_totals_matches_pandas(withdrawals):
+    result = query_engine.group_totals(withdrawals, 'Counterparty', 'Withdrawn')
+    expected = withdrawals.groupby('Counterparty', observed=True)['Withdrawn'].sum().sort_values(ascending=False)
+    assert result['Counterparty'].astype(str).tolist() == expected.index.astype(str).tolist()
+    assert result['Withdrawn'].tolist() == expected.tolist()
+
+
+def test_group_totals_by_key_and_limit(withdrawals):
+    by_day = query_engine.group_totals(withdrawals, 'Day of Month', 'Withdrawn', order='key')
+    assert by_day['Day of Month'].tolist() == [1, 2, 3]
+    assert by_day['Withdrawn'].tolist() == [400.0, 50.0, 20.0]
+    assert len(query_engine.group_totals(withdrawals, 'Counterparty', 'Withdrawn', limit=1)) == 1
+
+
+def test_filter_frame_keeps_index_and_dtypes(withdrawals):
+    result = query_engine.filter_frame(withdrawals, exclude={'Counterparty': ['NAIVAS']})
+    assert list(result.index) == [11, 13]
+    assert result['Counterparty'].dtype == 'category'
+
+
+def test_filter_frame_dates_and_ranges(withdrawals):
+    on_first = query_engine.filter_frame(withdrawals, dates=(date(2024, 1, 1), date(2024, 1, 1)))
+    assert list(on_first.index) == [10, 11]
+    mid_sized = query_engine.filter_frame(withdrawals, ranges={'Withdrawn': (50, 100)})
+    assert list(mid_sized.index) == [10, 12]
+
+
+def test_search_is_literal_and_case_insensitive(withdrawals):
+    assert list(query_engine.search(withdrawals, 'Details', 'naivas').index) == [10, 12]
+    assert list(query_engine.search(withdrawals, 'Details', '50%').index) == [11]
+    assert query_engine.search(withdrawals, 'Details', 'N.IVAS').empty
+
+
+def test_summary_of_empty_selection(withdrawals):
+    result = query_engine.summary(withdrawals, 'Withdrawn', include={'Counterparty': ['NOBODY']})
+    assert result == {'total': 0.0, 'mean': 0.0, 'count': 0}
+
+
+def test_user_sql_is_capped_and_sandboxed(withdrawals):
+    result, truncated = query_engine.run_user_sql({'withdrawals': withdrawals}, "SELECT * FROM range(10000);")
+    assert truncated and len(result) == query_engine.SQL_MAX_ROWS
+
+    with pytest.raises(Exception):
+        query_engine.run_user_sql({}, "SELECT * FROM read_csv('/etc/passwd')")
+
+
+@pytest.mark.parametrize("sql", [
+    "SELECT 1) AS x; CREATE TABLE leak AS SELECT * FROM withdrawals; SELECT * FROM (SELECT 1",
+    "SELECT 1; CREATE TABLE leak AS SELECT * FROM withdrawals",
+    "CREATE OR REPLACE MACRO leak(a) AS a",
+])
+def test_user_sql_rejects_anything_but_one_select(withdrawals, sql):
+    with pytest.raises(Exception):
+        query_engine.run_user_sql({'withdrawals': withdrawals}, sql)
+    with pytest.raises(Exception):
+        query_engine.run_user_sql({}, "SELECT * FROM leak")
+
+
+def test_user_sql_does_not_see_other_sessions_tables(withdrawals):
+    query_engine.run_user_sql({'withdrawals': withdrawals}, "SELECT COUNT(*) FROM withdrawals")
+    with pytest.raises(Exception):
+        query_engine.run_user_sql({}, "SELECT * FROM withdrawals")
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Tests for balance reconciliation and targeted page re-extraction
+"""
+
+import pandas as pd
+
+import loadtest
+import reconcile
+import statement
+
+
+def _paged(transactions, rows_per_page=50):
+    """Splits a statement into per-page tables tagged with their page numbers."""
+    pages = [transactions.iloc[i:i + rows_per_page] for i in range(0, len(transactions), rows_per_page)]
+    return pd.concat(statement.tag_pages(pages), ignore_index=True)
+
+
+def test_complete_statement_reconciles():
+    transactions = _paged(loadtest.synthetic_statement(1000, seed=2))
+    assert reconcile.find_gaps(transactions).empty
+
+
+def test_dropped_rows_are_located_by_page():
+    transactions = _paged(loadtest.synthetic_statement(1000, seed=2))
+    dropped = transactions.iloc[120:123]
+    gaps = reconcile.find_gaps(transactions.drop(index=dropped.index))
+
+    assert len(gaps) == 1
+    gap = gaps.iloc[0]
+    assert gap['Unexplained Amount'] == round((dropped['Paid In'] + dropped['Withdrawn']).sum(), 2)
+    assert gap['After'] == transactions.loc[123, 'Completion Time']
+    assert gap['Before'] == transactions.loc[119, 'Completion Time']
+    assert reconcile.affected_pages(gaps) == [3]
+
+
+def test_failed_transactions_are_ignored():
+    transactions = _paged(loadtest.synthetic_statement(200, seed=4))
+    failed = transactions.iloc[[10]].assign(**{'Transaction Status': 'Failed', 'Paid In': 999.0})
+    transactions = pd.concat([transactions.iloc[:10], failed, transactions.iloc[10:]], ignore_index=True)
+    assert reconcile.find_gaps(transactions).empty
+
+
+def test_repair_re_extracts_only_affected_pages(monkeypatch):
+    complete = _paged(loadtest.synthetic_statement(300, seed=6))
+    damaged = complete.drop(index=[75, 76])
+    requested = []
+
+    def fake_read(pdf, password, pages='all', **options):
+        requested.extend(pages)
+        page = complete[complete[reconcile.PAGE_COLUMN] == pages[0]]
+        return [page[statement.TRANSACTION_COLUMNS].astype(str)]
+
+    monkeypatch.setattr(statement, 'read_statement', fake_read)
+    repaired, gaps = reconcile.repair(damaged, None, "secret", reconcile.find_gaps(damaged))
+
+    assert requested == [2]
+    assert gaps.empty
+    assert len(repaired) == len(complete)
+
+
+def test_repair_keeps_the_original_when_re_extraction_fails(monkeypatch):
+    complete = _paged(loadtest.synthetic_statement(300, seed=6))
+    damaged = complete.drop(index=[75, 76])
+    gaps = reconcile.find_gaps(damaged)
+
+    def fail(pdf, password, pages='all', **options):
+        raise RuntimeError("lattice mode failed")
+
+    monkeypatch.setattr(statement, 'read_statement', fail)
+    repaired, remaining = reconcile.repair(damaged, None, "secret", gaps)
+
+    assert repaired is damaged
+    pd.testing.assert_frame_equal(remaining, gaps)
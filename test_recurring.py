@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Tests for the recurring-payment detector
+"""
+
+import time
+
+import numpy as np
+import pandas as pd
+
+import loadtest
+import recurring
+
+
+def _series(name, start, step_days, count, amount, jitter=0.0, seed=0):
+    rng = np.random.default_rng(seed)
+    times = pd.Timestamp(start) + pd.to_timedelta(np.arange(count) * step_days, unit='D') + pd.Timedelta(hours=9)
+    amounts = amount * (1 + rng.uniform(-jitter, jitter, count))
+    return pd.DataFrame({'Completion Time': times, 'Counterparty': name, 'Withdrawn': amounts})
+
+
+def test_detects_cadences_and_ignores_noise():
+    frame = pd.concat([
+        _series("LANDLORD", "2024-01-01", 30, 12, 25000),
+        _series("NETFLIX", "2024-01-03", 7, 30, 300),
+        _series("GYM", "2024-01-05", 14, 10, 2000, jitter=0.1),
+        # Regular timing but wildly varying amounts
+        _series("NAIVAS SUPERMARKET", "2024-01-02", 7, 30, 3000, jitter=0.9, seed=1),
+        # Too few occurrences
+        _series("CLINIC", "2024-02-01", 30, 2, 1500),
+    ], ignore_index=True)
+    frame['Counterparty'] = frame['Counterparty'].astype('category')
+
+    result = recurring.detect(frame, 'Withdrawn').set_index('Counterparty')
+
+    assert result['Cadence'].to_dict() == {"LANDLORD": "Monthly", "NETFLIX": "Weekly", "GYM": "Biweekly"}
+    assert result.loc["LANDLORD", 'Occurrences'] == 12
+    assert result.loc["LANDLORD", 'Last Seen'] == pd.Timestamp("2024-11-26")
+    assert result.loc["LANDLORD", 'Next Expected'] == pd.Timestamp("2024-12-26")
+
+
+def test_same_day_payments_count_once():
+    rent = _series("LANDLORD", "2024-01-01", 30, 6, 10000)
+    split = rent.assign(**{'Withdrawn': rent['Withdrawn'] / 2, 'Completion Time': rent['Completion Time'] + pd.Timedelta(hours=1)})
+    result = recurring.detect(pd.concat([rent, split]), 'Withdrawn')
+    assert result['Occurrences'].tolist() == [6]
+    assert result['Typical Amount'].tolist() == [15000]
+
+
+def test_scales_to_large_statements():
+    withdrawals = loadtest.session_frames(loadtest.synthetic_statement(200_000, days=3 * 365))['Withdrawals']
+    start = time.perf_counter()
+    recurring.detect(withdrawals, 'Withdrawn')
+    assert time.perf_counter() - start < 1.0
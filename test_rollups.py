@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+Tests that period comparisons from rollups match a recomputation
+"""
+
+import numpy as np
+import pytest
+
+import loadtest
+import rollups
+
+
+@pytest.fixture(scope="module")
+def entries():
+    return loadtest.session_frames(loadtest.synthetic_statement(3000, seed=5, days=120))
+
+
+@pytest.mark.parametrize("granularity", ["month", "week"])
+def test_compare_matches_recompute(entries, granularity):
+    withdrawals = entries['Withdrawals']
+    table = entries['period_rollups'][granularity]['spend']
+    base_period, compare_period = table.columns[-2], table.columns[-1]
+
+    result = rollups.compare(table, base_period, compare_period, exclude=["NCBA BANK"])
+
+    periods = rollups.period_keys(withdrawals['Completion Time'], granularity)
+    kept = withdrawals[withdrawals['Counterparty'] != "NCBA BANK"]
+    expected = kept.groupby([kept['Counterparty'].astype(str), periods[kept.index]])['Withdrawn'].sum().unstack(fill_value=0.0)
+    expected = expected.reindex(columns=[base_period, compare_period], fill_value=0.0)
+    expected = expected[(expected != 0).any(axis=1)]
+
+    assert "NCBA BANK" not in set(result['Counterparty'])
+    assert sorted(result['Counterparty']) == sorted(expected.index)
+    by_name = result.set_index('Counterparty')
+    np.testing.assert_allclose(by_name.loc[expected.index, base_period], expected[base_period])
+    np.testing.assert_allclose(by_name.loc[expected.index, 'Change'], expected[compare_period] - expected[base_period])
+    assert result['Change'].abs().is_monotonic_decreasing
+
+
+def test_period_keys_weeks_start_on_monday(entries):
+    times = entries['received']['Completion Time']
+    keys = rollups.period_keys(times, "week")
+    assert (keys.astype('datetime64[ns]').dt.weekday == 0).all()
+    assert ((times.dt.normalize() - keys.astype('datetime64[ns]')).dt.days.between(0, 6)).all()
@@ -1,190 +1,57 @@
 #!/usr/bin/env python3
 """
-Test script to validate session state and dynamic chart functionality
+Tests that the analysis pages keep their filters in session state and redraw
+the income chart for each chart type
 """
 
-import pandas as pd
-import sys
-import os
-
-# Add the current directory to path to import the modules
-sys.path.append('/home/runner/work/Mpesa_Analytics/Mpesa_Analytics')
-
-def test_session_state_initialization():
-    """Test that session state variables are initialized correctly"""
-    print("Testing session state initialization...")
-    
-    # Mock streamlit session state
-    class MockSessionState:
-        def __init__(self):
-            self.data = {}
-        
-        def __contains__(self, key):
-            return key in self.data
-        
-        def __getitem__(self, key):
-            return self.data[key]
-        
-        def __setitem__(self, key, value):
-            self.data[key] = value
-    
-    # Test initialization functions
-    try:
-        # Test revenue page session state
-        print("✓ Revenue page session state variables can be initialized")
-        
-        # Test expense page session state  
-        print("✓ Expense page session state variables can be initialized")
-        
-        return True
-    except Exception as e:
-        print(f"✗ Session state initialization failed: {e}")
-        return False
-
-def test_data_filtering():
-    """Test that data filtering works correctly"""
-    print("\nTesting data filtering functionality...")
-    
-    # Create sample data
-    dates = pd.to_datetime(['2024-01-01', '2024-01-02', '2024-01-03', '2024-01-04', '2024-01-05'])
-    sample_data = pd.DataFrame({
-        'Details': ['Source A', 'Source B', 'Source C', 'Source A', 'Source B'],
-        'Paid In': [1000, 2000, 1500, 800, 1200],
-        'date': dates.date
-    })
-    
-    try:
-        # Test amount filtering
-        min_amount = 1000
-        max_amount = 2000
-        filtered_data = sample_data[(sample_data['Paid In'] >= min_amount) & 
-                                   (sample_data['Paid In'] <= max_amount)]
-        assert len(filtered_data) == 4, f"Expected 4 rows, got {len(filtered_data)}"
-        print("✓ Amount range filtering works correctly")
-        
-        # Test source filtering
-        selected_sources = ['Source A', 'Source B']
-        source_filtered = sample_data[sample_data['Details'].isin(selected_sources)]
-        assert len(source_filtered) == 4, f"Expected 4 rows, got {len(source_filtered)}"
-        print("✓ Source filtering works correctly")
-        
-        # Test aggregation for charts
-        aggregated = sample_data.groupby('Details')['Paid In'].sum().sort_values(ascending=False)
-        # Source A: 1000 + 800 = 1800, Source B: 2000 + 1200 = 3200, Source C: 1500
-        # So Source B should be the top with 3200
-        assert aggregated.iloc[0] == 3200, f"Expected top source to have 3200, got {aggregated.iloc[0]}"
-        print("✓ Data aggregation for charts works correctly")
-        
-        return True
-    except Exception as e:
-        print(f"✗ Data filtering test failed: {e}")
-        return False
-
-def test_chart_type_functionality():
-    """Test that different chart types can be generated"""
-    print("\nTesting chart type functionality...")
-    
-    try:
-        # Test that we can import required libraries
-        import plotly.express as px
-        
-        # Create sample data for charts
-        sample_data = pd.DataFrame({
-            'Details': ['Source A', 'Source B', 'Source C'],
-            'Paid In': [1800, 2200, 1500]
-        })
-        
-        # Test bar chart creation
-        bar_fig = px.bar(sample_data, x='Details', y='Paid In', title='Test Bar Chart')
-        assert bar_fig is not None, "Bar chart creation failed"
-        print("✓ Bar chart can be created")
-        
-        # Test pie chart creation
-        pie_fig = px.pie(sample_data, values='Paid In', names='Details', title='Test Pie Chart')
-        assert pie_fig is not None, "Pie chart creation failed"
-        print("✓ Pie chart can be created")
-        
-        # Test line chart creation (with date data)
-        date_data = pd.DataFrame({
-            'date': pd.date_range('2024-01-01', periods=5),
-            'amount': [1000, 1200, 800, 1500, 1100]
-        })
-        line_fig = px.line(date_data, x='date', y='amount', title='Test Line Chart')
-        assert line_fig is not None, "Line chart creation failed"
-        print("✓ Line chart can be created")
-        
-        # Test scatter plot creation
-        scatter_data = pd.DataFrame({
-            'frequency': [5, 3, 7, 2],
-            'total_amount': [1800, 2200, 1500, 900],
-            'average_amount': [360, 733, 214, 450]
-        })
-        scatter_fig = px.scatter(scatter_data, x='frequency', y='total_amount', 
-                               size='average_amount', title='Test Scatter Plot')
-        assert scatter_fig is not None, "Scatter plot creation failed"
-        print("✓ Scatter plot can be created")
-        
-        return True
-    except Exception as e:
-        print(f"✗ Chart type test failed: {e}")
-        return False
-
-def test_search_functionality():
-    """Test that search functionality works correctly"""
-    print("\nTesting search functionality...")
-    
-    try:
-        # Create sample data
-        sample_data = pd.DataFrame({
-            'Details': ['Transfer from John', 'Salary Payment', 'Transfer from Jane', 'Bonus Payment'],
-            'Paid In': [1000, 5000, 800, 2000]
-        })
-        
-        # Test search for 'Transfer'
-        search_term = 'Transfer'
-        search_results = sample_data[sample_data['Details'].str.contains(search_term, na=False, case=False)]
-        assert len(search_results) == 2, f"Expected 2 results for 'Transfer', got {len(search_results)}"
-        print("✓ Search functionality works correctly")
-        
-        # Test search for 'Payment'
-        search_term = 'Payment'
-        search_results = sample_data[sample_data['Details'].str.contains(search_term, na=False, case=False)]
-        assert len(search_results) == 2, f"Expected 2 results for 'Payment', got {len(search_results)}"
-        print("✓ Case-insensitive search works correctly")
-        
-        return True
-    except Exception as e:
-        print(f"✗ Search functionality test failed: {e}")
-        return False
-
-def main():
-    """Run all tests"""
-    print("🧪 Running M-Pesa Analytics Session State and Dynamic Charts Tests")
-    print("="*60)
-    
-    tests = [
-        test_session_state_initialization,
-        test_data_filtering,
-        test_chart_type_functionality,
-        test_search_functionality
-    ]
-    
-    passed = 0
-    total = len(tests)
-    
-    for test in tests:
-        if test():
-            passed += 1
-    
-    print("\n" + "="*60)
-    print(f"Test Results: {passed}/{total} tests passed")
-    
-    if passed == total:
-        print("🎉 All tests passed! Session state and dynamic charts functionality is working correctly.")
-        return 0
-    else:
-        print("❌ Some tests failed. Please check the implementation.")
-        return 1
-
-if __name__ == "__main__":
-    exit(main())
\ No newline at end of file
+import json
+
+import pytest
+
+import loadtest
+
+
+@pytest.fixture(scope="module")
+def state():
+    return loadtest.session_frames(loadtest.synthetic_statement(500, seed=21))
+
+
+def _chart_titles(app):
+    return [json.loads(chart.proto.spec)['layout']['title']['text'] for chart in app.get("plotly_chart")]
+
+
+def test_receipts_page_initializes_its_filters(state):
+    app = loadtest._new_app("pages/Analyze_Receipts.py", state, timeout=60)
+    app.run()
+
+    assert not app.exception
+    assert app.session_state.revenue_chart_type == "Bar Chart"
+    assert app.session_state.revenue_search_term == ""
+    assert app.session_state.revenue_show_top_n == 15
+
+
+@pytest.mark.parametrize("chart_type, title", [
+    ("Pie Chart", "Income Source Distribution"),
+    ("Line Chart", "Daily Income Trend"),
+    ("Scatter Plot", "Income Sources"),
+])
+def test_chart_type_is_kept_and_redrawn(state, chart_type, title):
+    app = loadtest._new_app("pages/Analyze_Receipts.py", state, timeout=60)
+    app.run()
+    app.selectbox(key="chart_type_selector").select(chart_type).run()
+
+    assert not app.exception
+    assert app.session_state.revenue_chart_type == chart_type
+    assert any(title in text for text in _chart_titles(app))
+
+
+def test_expense_search_term_survives_reruns(state):
+    app = loadtest._new_app("pages/Analyze_Expenses.py", state, timeout=60)
+    app.run()
+    app.text_input(key="expense_search_input").input("NAIVAS").run()
+    app.run()
+
+    assert not app.exception
+    assert app.session_state.expense_search_term == "NAIVAS"
+    assert app.text_input(key="expense_search_input").value == "NAIVAS"
+    assert any("NAIVAS" in success.value for success in app.success)
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Tests for transaction table detection and normalization
+"""
+
+import csv
+import io
+
+import pandas as pd
+import pytest
+
+import loadtest
+import statement
+
+
+def raw_transaction_table(rows, header=True):
+    """A transaction table as tabula builds it: CSV text read back, so blank header cells become 'Unnamed: N'."""
+    lines = [] if not header else [['', 'Receipt No.', 'Completion\rTime', 'Details', 'Transaction\rStatus', 'Paid In', 'Withdrawn', 'Balance']]
+    lines += [
+        ['', f"R{i}", f"2024-01-{i + 1:02d} 10:00:00", "Merchant Payment to 123456 - SHOP", "Completed", '', "-1,000.00", "5,000.00"]
+        for i in range(rows)
+    ]
+    text = io.StringIO()
+    csv.writer(text).writerows(lines)
+    text.seek(0)
+    # Without a header row the first transaction ends up as the column names
+    return pd.read_csv(text, dtype=str)
+
+
+def test_detects_transaction_tables_by_header_not_position():
+    tables = [
+        pd.DataFrame({'Customer Name:': ['JOHN DOE'], 'Mobile Number:': ['0712******678']}),
+        raw_transaction_table(3),
+        pd.DataFrame({'Disclaimer': ['This statement is for information only']}),
+        pd.DataFrame({'TRANSACTION TYPE': ['SEND MONEY'], 'PAID IN': ['0.00'], 'PAID OUT': ['1,000.00']}),
+        raw_transaction_table(2),
+    ]
+    selected = statement.select_transaction_tables(tables)
+
+    assert len(selected) == 2
+    assert all(list(table.columns) == statement.TRANSACTION_COLUMNS for table in selected)
+
+
+def test_headerless_continuation_keeps_its_first_row():
+    tables = [raw_transaction_table(2), raw_transaction_table(3, header=False)]
+    selected = statement.select_transaction_tables(tables)
+
+    assert [len(table) for table in selected] == [2, 3]
+    assert selected[1]['Receipt No.'].tolist() == ["R0", "R1", "R2"]
+    assert selected[1]['Withdrawn'].tolist() == ["-1,000.00"] * 3
+    assert selected[1]['Paid In'].isna().all()
+
+
+def test_headerless_table_without_preceding_transactions_is_skipped():
+    assert statement.select_transaction_tables([raw_transaction_table(3, header=False)]) == []
+
+
+def test_normalize_transactions_parses_dates_and_amounts():
+    raw = pd.concat(statement.select_transaction_tables([raw_transaction_table(3)]), ignore_index=True)
+    repeated_header = pd.DataFrame([statement.TRANSACTION_COLUMNS], columns=statement.TRANSACTION_COLUMNS)
+    normalized = statement.normalize_transactions(pd.concat([raw, repeated_header], ignore_index=True))
+
+    assert len(normalized) == 3
+    assert normalized['Withdrawn'].tolist() == [-1000.0, -1000.0, -1000.0]
+    assert normalized['Paid In'].tolist() == [0, 0, 0]
+    assert normalized['Month'].tolist() == [1, 1, 1]
+
+
+def _fake_pdf(document, monkeypatch):
+    """Serves `document` ({page number: raw tables}) through read_statement, failing past the last page."""
+    reads = []
+
+    def fake_read(pdf, password, pages='all', **options):
+        reads.append(list(pages))
+        if max(pages) > max(document):
+            raise RuntimeError("Page number does not exist")
+        return [table for page in pages for table in document[page]]
+
+    monkeypatch.setattr(statement, 'read_statement', fake_read)
+    return reads
+
+
+def test_batches_match_one_shot_extraction(monkeypatch):
+    pages = {1: [pd.DataFrame({'TRANSACTION TYPE': ['SEND MONEY']}), raw_transaction_table(3)]}
+    pages.update({page: [raw_transaction_table(4, header=page % 2 == 0)] for page in range(2, 8)})
+    reads = _fake_pdf(pages, monkeypatch)
+
+    one_shot = statement.normalize_transactions(pd.concat(
+        statement.tag_pages(statement.select_transaction_tables([t for page in sorted(pages) for t in pages[page]])),
+        ignore_index=True,
+    ))
+    batches = [batch for _, batch in statement.read_in_batches(None, "secret", page_count=7, batch_size=3)]
+
+    assert reads == [[1, 2, 3], [4, 5, 6], [7]]
+    pd.testing.assert_frame_equal(pd.concat(batches, ignore_index=True), one_shot.reset_index(drop=True))
+
+
+def test_batches_without_page_count_stop_at_the_last_page(monkeypatch):
+    pages = {page: [raw_transaction_table(2)] for page in range(1, 6)}
+    reads = _fake_pdf(pages, monkeypatch)
+
+    batches = list(statement.read_in_batches(None, "secret", batch_size=3))
+
+    assert [last for last, _ in batches] == [3, 6]
+    assert sum(len(batch) for _, batch in batches) == 10
+    assert sorted(pd.concat([batch for _, batch in batches])[statement.PAGE_COLUMN].unique()) == [1, 2, 3, 4, 5]
+    assert reads[-1] == [6]
+
+
+def test_batches_without_page_count_read_documents_shorter_than_a_batch(monkeypatch):
+    pages = {page: [raw_transaction_table(2)] for page in range(1, 6)}
+    reads = _fake_pdf(pages, monkeypatch)
+
+    batches = list(statement.read_in_batches(None, "secret", batch_size=10))
+
+    assert len(batches) == 1
+    assert sorted(batches[0][1][statement.PAGE_COLUMN].unique()) == [1, 2, 3, 4, 5]
+    assert reads == [list(range(1, 11)), [1], [2], [3], [4], [5], [6]]
+
+
+def test_batches_without_page_count_raise_when_the_first_page_fails(monkeypatch):
+    def fail(pdf, password, pages='all', **options):
+        raise RuntimeError("Wrong password")
+
+    monkeypatch.setattr(statement, 'read_statement', fail)
+    with pytest.raises(RuntimeError):
+        list(statement.read_in_batches(None, "secret", batch_size=10))
+
+
+def test_session_frames_add_calendar_columns():
+    entries = loadtest.session_frames(loadtest.synthetic_statement(200, seed=4))
+    for name in ['Withdrawals', 'received']:
+        frame = entries[name]
+        times = frame['Completion Time']
+        assert frame['date'].tolist() == times.dt.date.tolist()
+        assert frame['weekday'].tolist() == times.dt.day_name().tolist()
+        assert frame['year_month'].tolist() == times.dt.strftime('%Y-%m').tolist()
+
+
+def test_batches_tag_real_pages_when_a_page_has_no_transactions(monkeypatch):
+    # Transactions start on page 2, so tagging by table position would be off by one
+    pages = {1: [pd.DataFrame({'TRANSACTION TYPE': ['SEND MONEY']})]}
+    pages.update({page: [raw_transaction_table(2)] for page in range(2, 5)})
+    reads = _fake_pdf(pages, monkeypatch)
+
+    batches = [batch for _, batch in statement.read_in_batches(None, "secret", page_count=4, batch_size=4)]
+
+    assert reads == [[1, 2, 3, 4], [1], [2], [3], [4]]
+    assert batches[0][statement.PAGE_COLUMN].tolist() == [2, 2, 3, 3, 4, 4]
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Tests for the widget metadata summarized at upload
+"""
+
+from datetime import date
+
+import pytest
+
+import loadtest
+import query_engine
+import widget_meta
+
+
+@pytest.fixture(scope="module")
+def received():
+    return loadtest.session_frames(loadtest.synthetic_statement(1500, seed=9))['received']
+
+
+def test_describe_matches_the_rows(received):
+    meta = widget_meta.describe(received, 'Paid In')
+
+    counts = received['Counterparty'].astype(str).value_counts()
+    assert meta['counts'] == counts.to_dict()
+    assert [meta['counts'][option] for option in meta['options']] == sorted(counts, reverse=True)
+    assert meta['histogram']['edges'][0] <= received['Paid In'].min()
+    assert meta['histogram']['edges'][-1] > received['Paid In'].max()
+    assert meta['histogram']['counts'].sum() == len(received)
+    assert meta['date_min'] == received['Completion Time'].min().date()
+    assert meta['date_max'] == received['Completion Time'].max().date()
+
+
+def test_clamp_date(received):
+    meta = widget_meta.describe(received, 'Paid In')
+    assert widget_meta.clamp_date(None, meta) == meta['date_max']
+    assert widget_meta.clamp_date(date(1999, 1, 1), meta) == meta['date_min']
+    assert widget_meta.clamp_date(date(2099, 1, 1), meta) == meta['date_max']
+    inside = meta['date_min'] + (meta['date_max'] - meta['date_min']) / 2
+    assert widget_meta.clamp_date(inside, meta) == inside
+
+
+def test_log_edges_cover_the_amounts():
+    assert widget_meta.log_edges(150, 4800).tolist() == [100, 200, 500, 1000, 2000, 5000]
+    assert widget_meta.log_edges(100, 1000).tolist() == [100, 200, 500, 1000, 2000]
+
+
+def test_bin_ranges_match_a_rescan(received):
+    histogram = widget_meta.describe(received, 'Paid In')['histogram']
+    edges = histogram['edges']
+    low, high = edges[1], edges[-2]
+
+    in_range = received[(received['Paid In'] >= low) & (received['Paid In'] < high)]
+    result = widget_meta.histogram_range(histogram, low, high)
+    assert result['count'] == len(in_range)
+    assert result['total'] == pytest.approx(in_range['Paid In'].sum())
+
+    filtered = query_engine.filter_frame(received, intervals={'Paid In': (low, high)})
+    assert list(filtered.index) == list(in_range.index)
+
+
+def test_histogram_excluding_matches_a_rescan(received):
+    histogram = widget_meta.describe(received, 'Paid In')['histogram']
+    removed = ["ACME LTD", "NOT A COUNTERPARTY"]
+    kept = received[~received['Counterparty'].isin(removed)]
+
+    result = widget_meta.histogram_range(widget_meta.histogram_excluding(histogram, removed), histogram['edges'][0], histogram['edges'][-1])
+    assert result['count'] == len(kept)
+    assert result['total'] == pytest.approx(kept['Paid In'].sum())
@@ -0,0 +1,174 @@
+"""
+Widget metadata computed once per upload.
+
+Sidebar widgets need option lists, amount bins and date bounds. Deriving
+them from the transactions on every rerun means a full scan of the rows each
+time a user touches any widget. Here they are summarized once, at ingestion,
+into a small dict kept in session state, and the pages build their widgets
+from that alone.
+
+Amounts are also counted into log-spaced bins with 1-2-5 edges (100, 200,
+500, 1,000, ...), kept per counterparty together with prefix sums. The count
+and total of a range of bins then take two prefix lookups, and excluding
+counterparties subtracts their rows of bins, without rescanning transactions.
+"""
+
+import numpy as np
+import pandas as pd
+
+EDGE_MULTIPLIERS = (1, 2, 5)
+
+
+def describe(frame, value, by='Counterparty'):
+    """
+    Summarizes `frame` for widget construction.
+
+    Args:
+    frame: Transactions with 'Completion Time', `by` and `value` columns.
+    value: The amount column.
+    by: The column offered as filter options.
+
+    Returns:
+    dict: 'options' (distinct `by` values, most frequent first), 'counts'
+        ({option: transactions}), 'histogram' (see amount_histogram, split
+        by `by`), and 'date_min' and 'date_max' as dates.
+    """
+    labels = frame[by].astype(str)
+    counts = labels.value_counts(sort=False)
+    # Most frequent first, ties alphabetical, so the order is stable across uploads
+    counts = counts.iloc[np.lexsort((counts.index.to_numpy(), -counts.to_numpy()))]
+
+    amounts = frame[value].to_numpy(dtype=float)
+    times = frame['Completion Time']
+
+    return {
+        'options': counts.index.tolist(),
+        'counts': counts.to_dict(),
+        'histogram': amount_histogram(amounts, labels.to_numpy()),
+        'date_min': pd.Timestamp(times.min()).date(),
+        'date_max': pd.Timestamp(times.max()).date(),
+    }
+
+
+def clamp_date(value, meta):
+    """`value` moved into the statement's date range, or the last statement date if `value` is None."""
+    if value is None:
+        return meta['date_max']
+    return min(max(value, meta['date_min']), meta['date_max'])
+
+
+def log_edges(low, high):
+    """
+    Bin edges on the 1-2-5 series, from the largest edge <= `low` to the smallest edge > `high`.
+
+    Non-positive amounts (reversals) get `low` itself as an extra first edge.
+    """
+    if low <= 0:
+        return np.concatenate([[low], log_edges(1.0, max(high, 1.0))])
+    first, last = int(np.floor(np.log10(low))), int(np.floor(np.log10(high))) + 1
+    series = np.array([m * 10.0 ** d for d in range(first, last + 1) for m in EDGE_MULTIPLIERS])
+    start = np.searchsorted(series, low, side='right') - 1
+    stop = np.searchsorted(series, high, side='right')
+    return series[start:stop + 1]
+
+
+def amount_histogram(amounts, groups):
+    """
+    Counts and totals of non-empty `amounts` per log-spaced bin, split by `groups`.
+
+    Bins are half-open, [edge, next edge), like the `intervals` filter of
+    query_engine, so a range of bins selects exactly the rows it counts.
+
+    Returns:
+    dict: 'edges'; 'groups' (pd.Index) with 'group_counts' and 'group_totals'
+        (groups x bins); and over all groups, 'counts' and 'totals' with their
+        prefix sums 'count_prefix' and 'total_prefix', which line up with
+        'edges'.
+    """
+    edges = log_edges(amounts.min(), amounts.max())
+    bins = np.searchsorted(edges, amounts, side='right') - 1
+
+    group_codes, group_index = pd.factorize(groups, sort=True)
+    shape = (len(group_index), len(edges) - 1)
+    cells = group_codes * shape[1] + bins
+    group_counts = np.bincount(cells, minlength=shape[0] * shape[1]).reshape(shape)
+    group_totals = np.bincount(cells, weights=amounts, minlength=shape[0] * shape[1]).reshape(shape)
+
+    return _with_prefix_sums({
+        'edges': edges,
+        'groups': pd.Index(group_index),
+        'group_counts': group_counts,
+        'group_totals': group_totals,
+    }, group_counts.sum(axis=0), group_totals.sum(axis=0))
+
+
+def _with_prefix_sums(histogram, counts, totals):
+    return {
+        **histogram,
+        'counts': counts,
+        'totals': totals,
+        'count_prefix': np.concatenate([[0], np.cumsum(counts)]),
+        'total_prefix': np.concatenate([[0.0], np.cumsum(totals)]),
+    }
+
+
+def histogram_excluding(histogram, removed=()):
+    """The histogram with the bins of the `removed` groups subtracted."""
+    positions = histogram['groups'].get_indexer(list(removed))
+    positions = positions[positions >= 0]
+    if not len(positions):
+        return histogram
+    counts = histogram['counts'] - histogram['group_counts'][positions].sum(axis=0)
+    totals = histogram['totals'] - histogram['group_totals'][positions].sum(axis=0)
+    return _with_prefix_sums(histogram, counts, totals)
+
+
+def histogram_range(histogram, low, high):
+    """Transaction count and total of the bins between edges `low` and `high`, from the prefix sums."""
+    first, last = np.searchsorted(histogram['edges'], [low, high])
+    return {
+        'count': int(histogram['count_prefix'][last] - histogram['count_prefix'][first]),
+        'total': float(histogram['total_prefix'][last] - histogram['total_prefix'][first]),
+    }
+
+
+def format_amount(amount):
+    """Short label for a bin edge: 500, 2k, 1M."""
+    for divisor, suffix in ((1e6, 'M'), (1e3, 'k')):
+        if abs(amount) >= divisor:
+            return f"{amount / divisor:g}{suffix}"
+    return f"{amount:g}"
+
+
+def render_distribution(histogram, label, selected=None):
+    """
+    Bar chart of transactions per amount bin, with the `selected` (low, high) edges highlighted.
+
+    The count and total of the selection come from the prefix sums.
+    """
+    import plotly.express as px
+    import streamlit as st
+
+    edges = histogram['edges']
+    low, high = selected if selected is not None else (edges[0], edges[-1])
+    bins = pd.DataFrame({
+        'Amount (Ksh)': [f"{format_amount(a)}–{format_amount(b)}" for a, b in zip(edges[:-1], edges[1:])],
+        'Transactions': histogram['counts'],
+        'Total (Ksh)': histogram['totals'],
+        'Selection': np.where((edges[:-1] >= low) & (edges[1:] <= high), "Selected", "Outside"),
+    })
+
+    in_range = histogram_range(histogram, low, high)
+    col1, col2 = st.columns(2)
+    col1.metric(f"{label} in Range", f"{in_range['count']:,}")
+    col2.metric("Total in Range", f"Ksh {in_range['total']:,.0f}")
+
+    fig = px.bar(
+        bins, x='Amount (Ksh)', y='Transactions', color='Selection',
+        hover_data={'Total (Ksh)': ':,.0f', 'Selection': False},
+        color_discrete_map={"Selected": "#1f77b4", "Outside": "#c7c7c7"},
+        category_orders={'Amount (Ksh)': bins['Amount (Ksh)'].tolist()},
+        title=f"{label} by Amount",
+    )
+    fig.update_layout(showlegend=False)
+    st.plotly_chart(fig, use_container_width=True)